@@ -0,0 +1,134 @@
+"""
+Batch reads & writes against DynamoDB.
+Requests are split into chunks at DynamoDB's per-call limits, and unprocessed keys are retried
+with exponential backoff.
+"""
+from backend.global_logger import logger
+from pynamodb.exceptions import PutError
+from pynamodb.settings import OperationSettings
+from concurrent.futures import ThreadPoolExecutor
+from random import uniform
+from time import sleep
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+
+MAX_WORKERS = 4
+MAX_RETRIES = 5
+BASE_BACKOFF_MS = 25
+
+
+def chunks(items, size) -> list:
+    """Split a list into consecutive lists of at most `size` items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def backoff(retries, base_backoff_ms=BASE_BACKOFF_MS) -> None:
+    """Sleep for a random ("full jitter") interval that grows exponentially with each retry."""
+    sleep(uniform(0, base_backoff_ms * (2 ** retries)) / 1000)
+
+
+def _get_chunk(model, keys, attributes_to_get, max_retries) -> tuple:
+    """
+    Read one chunk of up to BATCH_GET_LIMIT keys.
+    Returns a tuple: (list of model instances, list of keys left unprocessed after all retries).
+    """
+    hash_key_attribute = model._hash_key_attribute()
+    range_key_attribute = model._range_key_attribute()
+
+    keys_to_get = []
+    for hash_key, range_key in keys:
+        serialized_hash, serialized_range = model._serialize_keys(hash_key, range_key)
+        keys_to_get.append({
+            hash_key_attribute.attr_name:  {hash_key_attribute.attr_type: serialized_hash},
+            range_key_attribute.attr_name: {range_key_attribute.attr_type: serialized_range}
+        })
+
+    output = []
+    retries = 0
+    while keys_to_get:
+        # pynamodb's batch_get retries unprocessed keys immediately, so request each page directly
+        page, unprocessed = model._batch_get_page(keys_to_get,
+                                                  consistent_read=None,
+                                                  attributes_to_get=attributes_to_get,
+                                                  settings=OperationSettings.default)
+        output.extend(model.from_raw_data(item) for item in page or [])
+        keys_to_get = unprocessed or []
+
+        if keys_to_get:
+            if retries >= max_retries:
+                logger.warning(f"Giving up on {len(keys_to_get)} unprocessed keys after {retries} retries.")
+                break
+            retries += 1
+            logger.debug(f"Retrying {len(keys_to_get)} unprocessed keys, attempt #{retries}.")
+            backoff(retries)
+
+    unprocessed = [(key[hash_key_attribute.attr_name][hash_key_attribute.attr_type],
+                    key[range_key_attribute.attr_name][range_key_attribute.attr_type])
+                   for key in keys_to_get]
+    return output, unprocessed
+
+
+def batch_get(model, keys, attributes_to_get=None, max_workers=MAX_WORKERS, max_retries=MAX_RETRIES) -> tuple:
+    """
+    Read the provided (hash key, range key) tuples from the model's table using BatchGetItem.
+    Chunks are read concurrently.
+    Returns a tuple: (list of model instances, list of keys which couldn't be processed).
+    """
+    # BatchGetItem rejects duplicate keys
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return [], []
+
+    key_chunks = chunks(keys, BATCH_GET_LIMIT)
+    logger.debug(f"Reading {len(keys)} keys from {model.Meta.table_name} in {len(key_chunks)} chunks.")
+
+    items = []
+    unprocessed = []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(key_chunks))) as executor:
+        futures = [executor.submit(_get_chunk, model, chunk, attributes_to_get, max_retries)
+                   for chunk in key_chunks]
+        for future in futures:
+            chunk_items, chunk_unprocessed = future.result()
+            items.extend(chunk_items)
+            unprocessed.extend(chunk_unprocessed)
+
+    return items, unprocessed
+
+
+def _serialized_key(model, item) -> tuple:
+    """(hash key, range key) of a stored item, as returned in a BatchWriteItem PutRequest."""
+    hash_key_attribute = model._hash_key_attribute()
+    range_key_attribute = model._range_key_attribute()
+    return (item[hash_key_attribute.attr_name][hash_key_attribute.attr_type],
+            item[range_key_attribute.attr_name][range_key_attribute.attr_type])
+
+
+def batch_save(model, instances) -> list:
+    """
+    Write the provided model instances using BatchWriteItem, in chunks of BATCH_WRITE_LIMIT.
+    pynamodb retries unprocessed items with exponential backoff; returns any instances which
+    still couldn't be written.
+    """
+    failed = []
+    for chunk in chunks(instances, BATCH_WRITE_LIMIT):
+        batch = model.batch_write(auto_commit=False)
+        try:
+            with batch:
+                for instance in chunk:
+                    batch.save(instance)
+
+        except PutError as e:
+            if not batch.failed_operations:
+                # The entire request failed
+                logger.warning(f"Unable to write a chunk of {len(chunk)} items.\n{e}")
+                failed.extend(chunk)
+                continue
+
+            unprocessed = {_serialized_key(model, operation['PutRequest']['Item'])
+                           for operation in batch.failed_operations}
+            logger.warning(f"{len(unprocessed)} items unprocessed after retrying.\n{e}")
+            failed.extend(instance for instance in chunk
+                          if instance._get_hash_range_key_serialized_values() in unprocessed)
+
+    return failed
@@ -0,0 +1,64 @@
+from backend.batching import chunks, batch_get, batch_save
+from backend.models import Beverage
+from pynamodb.connection.table import TableConnection
+
+
+class TestBatching:
+    def test_chunks(self):
+        assert chunks(list(range(5)), 2) == [[0, 1], [2, 3], [4]]
+        assert chunks([], 25) == []
+
+    def test_batch_get(self, monkeypatch, stored_beverage):
+        pages = []
+
+        def stored(key) -> dict:
+            return stored_beverage(beverage_id=key['beverage_id']['S'], location=key['location']['S'])
+
+        def fake_batch_get_page(keys_to_get, **kwargs):
+            # Leave the last key unprocessed on the first attempt for each chunk
+            pages.append(len(keys_to_get))
+            if len(keys_to_get) > 1:
+                return [stored(key) for key in keys_to_get[:-1]], keys_to_get[-1:]
+            return [stored(key) for key in keys_to_get], None
+
+        monkeypatch.setattr(Beverage, "_batch_get_page", fake_batch_get_page)
+        monkeypatch.setattr("backend.batching.backoff", lambda retries: None)
+
+        keys = [(f"Beverage #{i}", "Home") for i in range(150)]
+        beverages, unprocessed = batch_get(Beverage, keys + keys[:10])
+
+        # Duplicates are removed, chunks are limited to 100 keys, and unprocessed keys are retried
+        assert len(beverages) == 150
+        assert unprocessed == []
+        assert sorted(pages) == [1, 1, 50, 100]
+
+    def test_batch_get_retries_exhausted(self, monkeypatch):
+        monkeypatch.setattr(Beverage, "_batch_get_page", lambda keys_to_get, **kwargs: ([], keys_to_get))
+        monkeypatch.setattr("backend.batching.backoff", lambda retries: None)
+
+        beverages, unprocessed = batch_get(Beverage, [("Beverage #1", "Home")], max_retries=2)
+        assert beverages == []
+        assert unprocessed == [("Beverage #1", "Home")]
+
+    def test_batch_save(self, monkeypatch):
+        requests = []
+
+        def fake_batch_write_item(self, put_items=None, delete_items=None, **kwargs):
+            # Never process the beverage named "Stubborn"
+            requests.append(len(put_items))
+            unprocessed = [{"PutRequest": {"Item": item}} for item in put_items
+                           if item['name']['S'] == "Stubborn"]
+            return {"UnprocessedItems": {"Cellar": unprocessed}} if unprocessed else {}
+
+        monkeypatch.setattr(TableConnection, "batch_write_item", fake_batch_write_item)
+        monkeypatch.setattr(Beverage.Meta, "base_backoff_ms", 1, raising=False)
+        monkeypatch.setattr(Beverage.Meta, "max_retry_attempts", 2, raising=False)
+
+        beverages = [Beverage(producer="Westbrook", name=f"Gose #{i}", year=2013, size="12 oz",
+                              location="Home") for i in range(30)]
+        stubborn = Beverage(producer="Westbrook", name="Stubborn", year=2013, size="12 oz", location="Home")
+        failed = batch_save(Beverage, beverages + [stubborn])
+
+        # Chunks are limited to 25 items, and items still unprocessed after retrying are returned
+        assert failed == [stubborn]
+        assert requests[:2] == [25, 6]
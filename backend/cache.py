@@ -0,0 +1,252 @@
+"""
+In-process, read-through caches of the serialized cellar inventory and picklists.
+Each process keeps its own copy, so the TTL bounds how stale a cache can get when writes
+are handled by a different instance of the app.
+"""
+from backend.global_logger import logger
+from backend.config import Config
+from hashlib import sha256
+from threading import Lock, Thread
+from time import monotonic
+import json
+
+
+class CellarCache(object):
+    """
+    Holds the output of `Beverage.to_dict()` for every beverage, keyed by (beverage_id, location).
+    Write paths patch the cache in place so it remains valid until the TTL expires.  Each write also
+    bumps the generation, so a read which started before the write can't load the cache.
+    The cache keeps the collection's ETag as of the load, until a write patches the cache.
+    """
+    def __init__(self, ttl=60, max_items=5000):
+        self.ttl = ttl
+        self.max_items = max_items
+
+        self._items = {}
+        self._loaded_at = None
+        self._etag = None
+        self._generation = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(beverage_id, location) -> tuple:
+        return str(beverage_id), str(location)
+
+    def _is_fresh(self) -> bool:
+        return self._loaded_at is not None and monotonic() - self._loaded_at < self.ttl
+
+    def get_all(self) -> tuple:
+        """
+        Return a tuple: (list of all cached beverages, the collection's ETag when they were loaded).
+        Returns (None, None) when the cache is empty or expired, and no ETag once a write patched it.
+        """
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return list(self._items.values()), self._etag
+
+            self.misses += 1
+            if self._loaded_at is not None:
+                logger.debug("Cellar cache expired.")
+                self._items = {}
+                self._loaded_at = None
+                self._etag = None
+            return None, None
+
+    def generation(self) -> int:
+        """Current generation; note it before reading the beverages to `load`."""
+        with self._lock:
+            return self._generation
+
+    def load(self, beverages, generation=None, etag=None) -> bool:
+        """
+        Replace the cache contents with the provided list of serialized beverages, which were read
+        when the collection's ETag was `etag`.
+        Returns False (and caches nothing) when the list exceeds `max_items`, or when the cache was
+        written to since `generation`, as the list may not include that write.
+        """
+        if len(beverages) > self.max_items:
+            logger.debug(f"Not caching {len(beverages)} beverages; limit is {self.max_items}.")
+            self.invalidate()
+            return False
+
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                logger.debug(f"Not caching {len(beverages)} beverages; the cellar changed while reading.")
+                return False
+            self._items = {self._key(bev['beverage_id'], bev['location']): bev for bev in beverages}
+            self._loaded_at = monotonic()
+            self._etag = etag
+            self.loads += 1
+
+        logger.debug(f"Cellar cache loaded with {len(beverages)} beverages.")
+        return True
+
+    def upsert(self, beverage) -> None:
+        """Add or replace a single serialized beverage in the cache."""
+        with self._lock:
+            self._generation += 1
+            self._etag = None
+            if self._loaded_at is None:
+                return
+
+            key = self._key(beverage['beverage_id'], beverage['location'])
+            if key not in self._items and len(self._items) >= self.max_items:
+                self._invalidate()
+                return
+
+            self._items[key] = beverage
+
+    def remove(self, beverage_id, location) -> None:
+        """Remove a single beverage from the cache."""
+        with self._lock:
+            self._generation += 1
+            self._etag = None
+            self._items.pop(self._key(beverage_id, location), None)
+
+    def invalidate(self) -> None:
+        """Empty the cache; the next read will go to the database."""
+        with self._lock:
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        self._items = {}
+        self._loaded_at = None
+        self._etag = None
+        self._generation += 1
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Counters for tuning the TTL and size limit."""
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits":          self.hits,
+                "misses":        self.misses,
+                "hit_rate":      round(self.hits / requests, 4) if requests else None,
+                "loads":         self.loads,
+                "invalidations": self.invalidations,
+                "size":          len(self._items),
+                "max_items":     self.max_items,
+                "ttl":           self.ttl,
+                "fresh":         self._is_fresh()
+            }
+
+
+class PicklistCache(object):
+    """
+    Holds the serialized picklists, which rarely change, with stale-while-revalidate semantics:
+    once the TTL passes, the cached picklists are still served while a background thread reloads them.
+    Only the first read, or the first after an invalidation, waits for the database.
+    """
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+
+        self._picklists = None
+        self._etag = None
+        self._loaded_at = None
+        self._refreshing = False
+        self._generation = 0
+        self._lock = Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def etag_for(picklists) -> str:
+        """ETag derived from the serialized picklists, which include each picklist's version."""
+        digest = sha256(json.dumps(picklists, sort_keys=True, default=str).encode()).hexdigest()
+        return f'"{digest[:32]}"'
+
+    def get(self, loader) -> tuple:
+        """
+        Return a tuple: (list of serialized picklists, ETag).
+        `loader` is called to read the picklists from the database when needed.
+        """
+        with self._lock:
+            if self._picklists is not None:
+                if monotonic() - self._loaded_at < self.ttl:
+                    self.hits += 1
+                else:
+                    self.stale_hits += 1
+                    if not self._refreshing:
+                        self._refreshing = True
+                        Thread(target=self._refresh, args=(loader, self._generation), daemon=True).start()
+                return self._picklists, self._etag
+
+            self.misses += 1
+            generation = self._generation
+
+        picklists = loader()
+        self._store(picklists, generation)
+        return picklists, self.etag_for(picklists)
+
+    def peek(self) -> list:
+        """Return the cached picklists while they're fresh, otherwise None, without loading them."""
+        with self._lock:
+            if self._picklists is None or monotonic() - self._loaded_at >= self.ttl:
+                return None
+            self.hits += 1
+            return self._picklists
+
+    def invalidate(self) -> None:
+        """Empty the cache; the next read will go to the database."""
+        with self._lock:
+            self._picklists = None
+            self._etag = None
+            self._loaded_at = None
+            self._generation += 1
+            self.invalidations += 1
+
+    def _refresh(self, loader, generation) -> None:
+        """Reload the picklists in the background, keeping the stale copy if that fails."""
+        try:
+            picklists = loader()
+            self._store(picklists, generation)
+            logger.debug("Picklist cache refreshed.")
+        except Exception as e:
+            logger.warning(f"Unable to refresh the picklist cache; serving stale picklists.\n{e}")
+            with self._lock:
+                if self._generation == generation and self._picklists is not None:
+                    # Wait another TTL before trying again
+                    self._loaded_at = monotonic()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _store(self, picklists, generation) -> None:
+        """Cache the picklists, unless the cache was invalidated since they were requested."""
+        etag = self.etag_for(picklists)
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._picklists = picklists
+            self._etag = etag
+            self._loaded_at = monotonic()
+            self.refreshes += 1
+
+    def stats(self) -> dict:
+        """Counters for tuning the TTL."""
+        with self._lock:
+            return {
+                "hits":          self.hits,
+                "stale_hits":    self.stale_hits,
+                "misses":        self.misses,
+                "refreshes":     self.refreshes,
+                "invalidations": self.invalidations,
+                "size":          len(self._picklists) if self._picklists is not None else 0,
+                "ttl":           self.ttl,
+                "etag":          self._etag
+            }
+
+
+cellar_cache = CellarCache(ttl=Config.CELLAR_CACHE_TTL, max_items=Config.CELLAR_CACHE_MAX_ITEMS)
+picklist_cache = PicklistCache(ttl=Config.PICKLIST_CACHE_TTL)
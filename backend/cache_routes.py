@@ -0,0 +1,20 @@
+from backend.global_logger import logger
+from backend.cache import cellar_cache, picklist_cache
+from backend.singleflight import cellar_reads, picklist_reads
+from flask import request
+from flask_restful import Resource
+import json
+
+
+class CacheStatsApi(Resource):
+    """
+    Reports hit/miss counters for the in-process caches, and how many reads were coalesced.
+    Endpoint: /api/v1/cache-stats
+    """
+    def get(self) -> json:
+        """Return the current counters for each cache."""
+        logger.debug(f"Request: {request}")
+        return {'message': 'Success', 'data': {'cellar':         cellar_cache.stats(),
+                                               'picklists':      picklist_cache.stats(),
+                                               'cellar_reads':   cellar_reads.stats(),
+                                               'picklist_reads': picklist_reads.stats()}}, 200
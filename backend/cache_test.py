@@ -0,0 +1,139 @@
+from backend.cache import CellarCache, PicklistCache
+from time import sleep
+
+
+def make_beverage(beverage_id, location="Home", qty=1) -> dict:
+    return {"beverage_id": beverage_id, "location": location, "qty": qty}
+
+
+class TestCellarCache:
+    def test_read_through(self):
+        cache = CellarCache(ttl=60, max_items=10)
+
+        # Empty cache is a miss
+        assert cache.get_all()[0] is None
+        assert cache.stats()['misses'] == 1
+
+        # Once loaded, reads are hits
+        cache.load([make_beverage("a"), make_beverage("b")])
+        assert len(cache.get_all()[0]) == 2
+        assert cache.stats()['hits'] == 1
+        assert cache.stats()['size'] == 2
+
+    def test_ttl(self):
+        cache = CellarCache(ttl=0.05, max_items=10)
+        cache.load([make_beverage("a")])
+        assert cache.get_all()[0] is not None
+
+        sleep(0.1)
+        assert cache.get_all()[0] is None
+        assert cache.stats()['size'] == 0
+
+    def test_size_bound(self):
+        cache = CellarCache(ttl=60, max_items=2)
+
+        # Too many beverages to cache
+        assert cache.load([make_beverage("a"), make_beverage("b"), make_beverage("c")]) is False
+        assert cache.get_all()[0] is None
+
+        # Adding beyond the limit invalidates the cache
+        cache.load([make_beverage("a"), make_beverage("b")])
+        cache.upsert(make_beverage("c"))
+        assert cache.get_all()[0] is None
+
+    def test_write_patching(self):
+        cache = CellarCache(ttl=60, max_items=10)
+        cache.load([make_beverage("a"), make_beverage("b")])
+
+        # Updates replace the existing record
+        cache.upsert(make_beverage("a", qty=5))
+        assert {"beverage_id": "a", "location": "Home", "qty": 5} in cache.get_all()[0]
+
+        # Same beverage_id at a different location is a separate record
+        cache.upsert(make_beverage("a", location="Fridge"))
+        assert len(cache.get_all()[0]) == 3
+
+        cache.remove("a", "Home")
+        assert len(cache.get_all()[0]) == 2
+
+        cache.invalidate()
+        assert cache.get_all()[0] is None
+
+    def test_upsert_when_empty(self):
+        # Writes don't populate an empty cache, since it wouldn't contain the full cellar
+        cache = CellarCache(ttl=60, max_items=10)
+        cache.upsert(make_beverage("a"))
+        assert cache.get_all()[0] is None
+
+    def test_etag(self):
+        cache = CellarCache(ttl=60, max_items=10)
+        cache.load([make_beverage("a")], etag='W/"5.0"')
+        assert cache.get_all() == ([make_beverage("a")], 'W/"5.0"')
+
+        # Once patched, the cache no longer matches the version it was loaded at
+        cache.upsert(make_beverage("b"))
+        assert cache.get_all()[1] is None
+
+    def test_write_while_loading(self):
+        cache = CellarCache(ttl=60, max_items=10)
+
+        # A read taken before a write can't load the cache, as it may be missing that write
+        for write in (lambda: cache.upsert(make_beverage("b")), lambda: cache.remove("a", "Home"),
+                      cache.invalidate):
+            generation = cache.generation()
+            write()
+            assert cache.load([make_beverage("a")], generation=generation) is False
+            assert cache.get_all()[0] is None
+
+        generation = cache.generation()
+        assert cache.load([make_beverage("a")], generation=generation) is True
+        assert cache.get_all()[0] == [make_beverage("a")]
+
+
+class TestPicklistCache:
+    def test_stale_while_revalidate(self):
+        cache = PicklistCache(ttl=60)
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return [{"list_name": "size", "version": len(loads)}]
+
+        # The first read loads synchronously, then reads are served from memory
+        picklists, etag = cache.get(loader)
+        assert picklists == [{"list_name": "size", "version": 1}]
+        assert cache.get(loader) == (picklists, etag)
+        assert len(loads) == 1
+
+        # Once stale, the cached picklists are served while they're reloaded in the background
+        cache.ttl = 0
+        assert cache.get(loader) == (picklists, etag)
+        for _ in range(500):
+            if cache.stats()['refreshes'] == 2:
+                break
+            sleep(0.01)
+
+        cache.ttl = 60
+        refreshed, refreshed_etag = cache.get(loader)
+        assert refreshed == [{"list_name": "size", "version": 2}]
+        assert refreshed_etag != etag
+
+    def test_invalidate(self):
+        cache = PicklistCache(ttl=60)
+        cache.get(lambda: [{"list_name": "size", "version": 1}])
+
+        cache.invalidate()
+        picklists, _ = cache.get(lambda: [{"list_name": "size", "version": 2}])
+        assert picklists == [{"list_name": "size", "version": 2}]
+        assert cache.stats()['invalidations'] == 1
+
+    def test_peek(self):
+        cache = PicklistCache(ttl=60)
+        assert cache.peek() is None
+
+        # Only fresh picklists are returned, and nothing is loaded
+        cache.get(lambda: [{"list_name": "size", "version": 1}])
+        assert cache.peek() == [{"list_name": "size", "version": 1}]
+
+        cache.ttl = 0
+        assert cache.peek() is None
@@ -1,40 +1,224 @@
 from backend.global_logger import logger
+from backend.batching import batch_get, batch_save
+from backend.cache import cellar_cache
+from backend.changelog import changes_since, collection_version, record_upsert, record_upserts, \
+    record_delete, SyncWindowExpired
+from backend.filters import parse_filters, read_beverages, matches, CURSOR_KEY_TYPES
+from backend.exports import iter_beverages, iter_ndjson, iter_csv, CSV_READ_FIELDS, CSV_MIMETYPE, \
+    NDJSON_MIMETYPE
+from backend.idempotency import idempotent
 from backend.models import Beverage
-from flask import request
+from backend.moves import move_beverage, MoveConflict
+from backend.pagination import encode_cursor, decode_cursor, parse_limit, DEFAULT_LIMIT
+from backend.preconditions import etag, if_match_condition, not_modified, PreconditionFailed
+from backend.singleflight import cellar_reads
+from flask import request, Response, stream_with_context
 from flask_restful import Resource
-from pynamodb.exceptions import PynamoDBException
+from pynamodb.exceptions import PynamoDBException, UpdateError, TransactWriteError
 from datetime import datetime
+from math import isfinite
 import json
 
 
+def parse_fields(value) -> list:
+    """
+    Validate the comma-separated `fields` query parameter against the Beverage attributes.
+    Returns None when not provided; otherwise the requested fields plus the key fields.
+    """
+    if not value:
+        return None
+
+    requested = [field.strip() for field in value.split(',') if field.strip()]
+    invalid = [field for field in requested if field not in Beverage.FIELDS]
+    if invalid:
+        raise ValueError(f"Invalid fields requested: {', '.join(invalid)}.")
+
+    return [field for field in Beverage.FIELDS if field in requested or field in Beverage.KEY_FIELDS]
+
+
+def project(beverage, fields) -> dict:
+    """Limit a serialized beverage to the provided fields."""
+    return {field: beverage[field] for field in fields if field in beverage}
+
+
+def collection_etag() -> str:
+    """
+    Weak ETag for the entire cellar, from the collection version kept by the write paths.
+    Returns None when the version can't be read.  Weak, since the order of scanned items can vary.
+    """
+    try:
+        version, last_modified = collection_version()
+    except PynamoDBException as e:
+        logger.warning(f"Unable to read the cellar's version.\n{e}")
+        return None
+    return f'W/"{version}.{int(last_modified or 0)}"'
+
+
 class CellarCollectionApi(Resource):
     """
     For requesting the entire cellar inventory and submitting new beverages.
     Endpoint: /api/v1/cellar
     """
     def get(self) -> json:
-        """Return all beverages in the database."""
+        """
+        Return beverages from the database.
+        When neither `limit` nor `cursor` are provided, all beverages are returned.  Otherwise,
+        returns one page of up to `limit` (default: DEFAULT_LIMIT) beverages plus a `next_cursor`
+        for the following page.
+        When `since` (epoch, in ms) is provided, only returns changes made after that time.
+        When `fields` is provided, only those attributes (plus the keys) are returned.
+        Results may be filtered by `producer`, `style`, `location`, `for_trade`, `year`, & `in_stock`.
+        Responses include an ETag for the collection; when it matches If-None-Match, returns 304
+        without reading any beverages.  Responses served from the cache use the ETag the cache was
+        loaded under, so the ETag never claims a newer version than the beverages returned.
+        """
         logger.debug(f"Request: {request}")
 
         try:
-            # Read from the database
-            beverages = Beverage.scan()
+            fields = parse_fields(request.args.get('fields'))
+            filters = parse_filters(request.args)
+        except ValueError as e:
+            logger.debug(f"Invalid parameters: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
+        if request.args.get('since') is not None:
+            if filters:
+                error_msg = f"Filters can't be combined with `since`."
+                logger.debug(error_msg)
+                return {'message': 'Error', 'data': error_msg}, 400
+
+            current_etag = collection_etag()
+            if current_etag and not_modified(current_etag):
+                return self.not_modified_response(current_etag)
+            body, status = self.get_changes(request.args.get('since'), fields=fields)
+            return body, status, {'ETag': current_etag} if current_etag and status == 200 else {}
+
+        # Validate any pagination parameters
+        try:
+            limit = parse_limit(request.args.get('limit'))
+            cursor = request.args.get('cursor') or None
+            start_key = decode_cursor(cursor, key_types=CURSOR_KEY_TYPES, required=Beverage.KEY_FIELDS)
+        except ValueError as e:
+            logger.debug(f"Invalid pagination parameters: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
+        # Pages are always bounded, even when only a cursor is provided
+        paginate = limit is not None or cursor is not None
+        if paginate and limit is None:
+            limit = DEFAULT_LIMIT
+
+        # Serve the full inventory from the cache when possible, with the ETag it was loaded under
+        if not paginate:
+            cached, cached_etag = cellar_cache.get_all()
+            if cached is not None:
+                if cached_etag and not_modified(cached_etag):
+                    return self.not_modified_response(cached_etag)
+                if filters:
+                    cached = [bev for bev in cached if matches(bev, filters)]
+                if fields:
+                    cached = [project(bev, fields) for bev in cached]
+                logger.debug(f"End of CellarCollectionApi.GET, served {len(cached)} beverages from cache.")
+                return {'message': 'Success', 'data': cached}, 200, {'ETag': cached_etag} if cached_etag else {}
+
+        # Note the cache generation before the version, so a local write after either is detected
+        generation = cellar_cache.generation()
+
+        # Nothing needs to be read when the client already has the current collection
+        current_etag = collection_etag()
+        if current_etag and not_modified(current_etag):
+            return self.not_modified_response(current_etag)
 
-            # Convert each record to a dictionary, compile into a list
-            output = []
-            count = 0
-            for bev in beverages:
-                output.append(bev.to_dict(dates_as_epoch=True))
-                count += 1
+        try:
+            # Concurrent identical requests share a single read, if they saw the same version
+            key = (tuple(sorted(filters.items())), paginate, limit, cursor, tuple(fields or ()), current_etag)
+            output, last_evaluated_key, read_etag = cellar_reads.do(key, self.read, filters, paginate=paginate,
+                                                                    limit=limit, start_key=start_key,
+                                                                    fields=fields, etag=current_etag,
+                                                                    generation=generation)
+            headers = {'ETag': read_etag} if read_etag else {}
+
+            if paginate:
+                next_cursor = encode_cursor(last_evaluated_key)
+                logger.debug(f"End of CellarCollectionApi.GET, returned {len(output)} beverages.")
+                return {'message': 'Success', 'data': output, 'next_cursor': next_cursor}, 200, headers
 
             logger.debug(f"End of CellarCollectionApi.GET")
-            return {'message': 'Success', 'data': output}, 200
+            return {'message': 'Success', 'data': output}, 200, headers
 
         except PynamoDBException as e:
             error_msg = f"Error attempting to retrieve beverages from the database."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
 
+    @staticmethod
+    def not_modified_response(current_etag) -> tuple:
+        """304 response for a client which already has the collection at `current_etag`."""
+        logger.debug(f"End of CellarCollectionApi.GET, not modified.")
+        return None, 304, {'ETag': current_etag}
+
+    @staticmethod
+    def read(filters, paginate=False, limit=None, start_key=None, fields=None, etag=None,
+             generation=None) -> tuple:
+        """
+        Read beverages from the database, loading the cache when the complete inventory was read.
+        `etag` is the collection's ETag and `generation` the cache's generation, both noted before
+        the read.  The version is read again afterwards, since the beverages only match `etag` when
+        nothing was written during the read, on this instance or another.
+        Returns a tuple: (list of serialized beverages, last evaluated key when paginating,
+        `etag` if the beverages match it, otherwise None).
+        """
+        beverages = read_beverages(filters, paginate=paginate, limit=limit, start_key=start_key,
+                                   fields=fields)
+
+        # Convert each record to a dictionary, compile into a list
+        output = [bev.to_dict(dates_as_epoch=True, fields=fields) for bev in beverages]
+        last_evaluated_key = beverages.last_evaluated_key if paginate else None
+
+        if etag is not None and collection_etag() != etag:
+            logger.debug(f"The cellar changed while reading beverages at {etag}.")
+            return output, last_evaluated_key, None
+
+        # Only cache the complete inventory
+        if not paginate and not fields and not filters:
+            cellar_cache.load(output, generation=generation, etag=etag)
+        return output, last_evaluated_key, etag
+
+    @staticmethod
+    def get_changes(since, fields=None) -> json:
+        """
+        Return beverages modified after `since` (epoch, in ms), plus tombstones for beverages
+        deleted after that time.  Clients should use `as_of` as `since` for their next request;
+        `as_of` lags slightly, so changes from the last few seconds may be returned again.
+        """
+        try:
+            since = float(since)
+            if not isfinite(since):
+                raise ValueError
+        except ValueError:
+            error_msg = f"Since must be an epoch (in ms), not: {since}."
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        try:
+            updated, deleted, as_of = changes_since(since)
+            if fields:
+                updated = [project(bev, fields) for bev in updated]
+            logger.debug(f"End of CellarCollectionApi.GET, returned {len(updated)} updated "
+                         f"and {len(deleted)} deleted beverages.")
+            return {'message': 'Success', 'data': updated, 'deleted': deleted, 'as_of': as_of}, 200
+
+        except SyncWindowExpired as e:
+            logger.debug(f"Delta sync requested for an expired window.\n{e}")
+            return {'message': 'Gone', 'data': f'{e}  Request the full cellar instead.'}, 410
+        except (ValueError, OverflowError) as e:
+            logger.debug(f"Invalid since: {since}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve changes from the database."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+    @idempotent
     def post(self) -> json:
         """Add a new beverage to the database based on the provided JSON."""
         logger.debug(f"Request: {request}")
@@ -77,34 +261,421 @@ class CellarCollectionApi(Resource):
             logger.debug(f"{error_msg}\n{e}.")
             return {'message': 'Error', 'data': error_msg}, 500
 
-        # Write this Beverage to the database
+        # Write this Beverage to the database, incrementing the version of any beverage it replaces
         try:
             logger.debug(f"Attempting to save Beverage {new_beverage} to the database.")
-            new_beverage.save()
+            new_beverage.replace()
             logger.info(f"Successfully saved {new_beverage}.")
+
+            output = new_beverage.to_dict(dates_as_epoch=True)
+            cellar_cache.upsert(output)
+            record_upsert(output)
             logger.debug(f"End of CellarCollectionApi.POST")
 
-            return {'message': 'Created', 'data': new_beverage.to_dict(dates_as_epoch=True)}, 201
+            return {'message': 'Created', 'data': output}, 201
         except PynamoDBException as e:
             error_msg = f"Error attempting to save new beverage."
             logger.debug(f"{error_msg}\n{new_beverage}: {e}.")
             return {'message': 'Error', 'data': error_msg}, 500
 
 
+class CellarExportApi(Resource):
+    """
+    For exporting the entire cellar inventory, e.g. for backups.
+    Endpoint: /api/v1/cellar/export
+    """
+    FORMATS = {
+        'ndjson': (iter_ndjson, NDJSON_MIMETYPE),
+        'csv':    (iter_csv, CSV_MIMETYPE)
+    }
+
+    def get(self) -> Response:
+        """
+        Stream every beverage in the requested `format`: ndjson (default, one beverage per line), or
+        csv with the columns of the cellar spreadsheet.  Accepts the same filters as /api/v1/cellar,
+        plus `fields` for ndjson.  Beverages are read a page at a time and never cached, so the
+        export doesn't hold the whole cellar in memory.
+        """
+        logger.debug(f"Request: {request}")
+
+        export_format = request.args.get('format') or 'ndjson'
+        if export_format not in self.FORMATS:
+            error_msg = f"Format must be one of: {', '.join(self.FORMATS)}, not: {export_format}."
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            filters = parse_filters(request.args)
+        except ValueError as e:
+            logger.debug(f"Invalid parameters: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
+        if export_format == 'csv':
+            if fields:
+                error_msg = f"Fields can't be selected for csv exports."
+                logger.debug(error_msg)
+                return {'message': 'Error', 'data': error_msg}, 400
+            fields = CSV_READ_FIELDS
+
+        try:
+            beverages = iter_beverages(filters, fields=fields)
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve beverages from the database."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        serialize, mimetype = self.FORMATS[export_format]
+        headers = {'Content-Disposition': f'attachment; filename=cellar.{export_format}'}
+
+        logger.debug(f"End of CellarExportApi.GET, streaming {export_format}.")
+        return Response(stream_with_context(serialize(beverages)), mimetype=mimetype, headers=headers)
+
+
+class BeverageBulkApi(Resource):
+    """
+    For adding many beverages in one request.
+    Endpoint: /api/v1/cellar/bulk
+    """
+    # Limit on the number of beverages accepted per request
+    MAX_ITEMS = 500
+
+    @idempotent
+    def post(self) -> json:
+        """
+        Add each beverage from the list provided in the body, using batch writes.
+        BatchWriteItem can't increment versions, so beverages which already exist are rejected
+        rather than replaced; use POST /api/v1/cellar or PUT to replace them.
+        Returns a result for each item, in the order provided.
+        """
+        logger.debug(f"Request: {request}")
+
+        # Ensure there's a body to accompany this request
+        if not request.data:
+            return {'message': 'Error', 'data': 'POST request must contain a body.'}, 400
+
+        # Load the provided JSON
+        try:
+            data = json.loads(request.data.decode())
+            logger.debug(f"Data submitted: {type(data)}, {data}")
+
+        except json.JSONDecodeError as e:
+            error_msg = f"Error attempting to decode the provided JSON."
+            logger.debug(f"{error_msg},\n{request.data.__str__()},\n{e}")
+            return {'message': 'Error', 'data': error_msg + f"\n{request.data.__str__()}"}, 400
+
+        if not isinstance(data, list):
+            return {'message': 'Error', 'data': 'Body must be a list of beverages.'}, 400
+        if len(data) > self.MAX_ITEMS:
+            error_msg = f"Too many beverages provided: {len(data)}.  Limit is {self.MAX_ITEMS}."
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        # Create a new Beverage from each item, recording an error for any that are invalid
+        results = [None] * len(data)
+        new_beverages = []
+        seen = {}
+        for index, item in enumerate(data):
+            if not isinstance(item, dict):
+                results[index] = {'index': index, 'status': 400, 'message': 'Error',
+                                  'data': 'Each beverage must be an object.'}
+                continue
+
+            # Replace empty strings with None
+            for key in item.keys():
+                if item[key] == "":
+                    item[key] = None
+
+            try:
+                beverage = Beverage(**item)
+            except Exception as e:
+                error_msg = f"Error creating a new Beverage from: {item}."
+                logger.debug(f"{error_msg}\n{e}.")
+                results[index] = {'index': index, 'status': 400, 'message': 'Error',
+                                  'data': f"{error_msg}\n{e}"}
+                continue
+
+            # BatchWriteItem rejects requests containing the same key twice
+            key = (beverage.beverage_id, beverage.location)
+            if key in seen:
+                results[index] = {'index': index, 'status': 400, 'message': 'Error',
+                                  'data': f"Duplicate of beverage #{seen[key]}."}
+                continue
+
+            seen[key] = index
+            new_beverages.append((index, beverage))
+
+        # Reject beverages which already exist, since overwriting them would reset their versions
+        try:
+            existing, unchecked = batch_get(Beverage, list(seen), attributes_to_get=list(Beverage.KEY_FIELDS))
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to check for existing beverages."
+            logger.debug(f"{error_msg}\n{e}.")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        existing = {(bev.beverage_id, bev.location) for bev in existing}
+        unchecked = set(unchecked)
+        for index, beverage in new_beverages:
+            key = (beverage.beverage_id, beverage.location)
+            if key in existing:
+                results[index] = {'index': index, 'status': 409, 'message': 'Conflict',
+                                  'data': f"Beverage {key[0]} already exists at {key[1]}."}
+            elif key in unchecked:
+                results[index] = {'index': index, 'status': 500, 'message': 'Error',
+                                  'data': f"Error attempting to check whether {beverage} exists."}
+            else:
+                beverage.version = 1
+        new_beverages = [(index, beverage) for index, beverage in new_beverages if results[index] is None]
+
+        # Write the valid beverages to the database
+        try:
+            logger.debug(f"Attempting to save {len(new_beverages)} beverages to the database.")
+            failed = batch_save(Beverage, [beverage for index, beverage in new_beverages])
+
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to save new beverages."
+            logger.debug(f"{error_msg}\n{e}.")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        failed = {id(beverage) for beverage in failed}
+        created = []
+        for index, beverage in new_beverages:
+            if id(beverage) in failed:
+                results[index] = {'index': index, 'status': 500, 'message': 'Error',
+                                  'data': f"Error attempting to save {beverage}."}
+            else:
+                output = beverage.to_dict(dates_as_epoch=True)
+                cellar_cache.upsert(output)
+                created.append(output)
+                results[index] = {'index': index, 'status': 201, 'message': 'Created', 'data': output}
+
+        record_upserts(created)
+        logger.info(f"Successfully saved {len(created)} of {len(data)} beverages.")
+        logger.debug(f"End of BeverageBulkApi.POST")
+
+        if len(created) == len(data):
+            return {'message': 'Created', 'data': results}, 201
+        return {'message': 'Multi-Status', 'data': results}, 207
+
+
+class BeverageBatchGetApi(Resource):
+    """
+    For requesting many specific beverages in one request.
+    Endpoint: /api/v1/cellar/batch-get
+    """
+    # Limit on the number of keys accepted per request
+    MAX_KEYS = 500
+
+    def post(self) -> json:
+        """
+        Return the beverages for a list of `{beverage_id, location}` keys provided in the body.
+        Keys which don't exist are listed in `not_found`.  Keys which DynamoDB didn't process
+        after retrying are listed in `unprocessed`, and may be requested again.
+        """
+        logger.debug(f"Request: {request}")
+
+        # Ensure there's a body to accompany this request
+        if not request.data:
+            return {'message': 'Error', 'data': 'POST request must contain a body.'}, 400
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.debug(f"Invalid fields requested: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
+        # Load the provided JSON
+        try:
+            data = json.loads(request.data.decode())
+            logger.debug(f"Data submitted: {data}")
+            keys = [(str(key['beverage_id']), str(key['location'])) for key in data]
+
+        except json.JSONDecodeError as e:
+            error_msg = f"Error attempting to decode the provided JSON."
+            logger.debug(f"{error_msg},\n{request.data.__str__()},\n{e}")
+            return {'message': 'Error', 'data': error_msg + f"\n{request.data.__str__()}"}, 400
+        except (KeyError, TypeError) as e:
+            error_msg = f"Body must be a list of objects containing `beverage_id` and `location`."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        if len(keys) > self.MAX_KEYS:
+            error_msg = f"Too many keys requested: {len(keys)}.  Limit is {self.MAX_KEYS}."
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        try:
+            beverages, unprocessed = batch_get(Beverage, keys, attributes_to_get=fields)
+
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve beverages from the database."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        output = [bev.to_dict(dates_as_epoch=True, fields=fields) for bev in beverages]
+
+        # Identify keys that were processed but didn't return an item
+        found = {(bev['beverage_id'], bev['location']) for bev in output}
+        not_found = [{"beverage_id": beverage_id, "location": location}
+                     for beverage_id, location in dict.fromkeys(keys)
+                     if (beverage_id, location) not in found
+                     and (beverage_id, location) not in unprocessed]
+
+        logger.debug(f"End of BeverageBatchGetApi.POST, returned {len(output)} beverages.")
+        return {'message':     'Success',
+                'data':        output,
+                'not_found':   not_found,
+                'unprocessed': [{"beverage_id": beverage_id, "location": location}
+                                for beverage_id, location in unprocessed]}, 200
+
+
+class BeverageLocationsApi(Resource):
+    """
+    For requesting a beverage at every location where it's stored.
+    Endpoint: /api/v1/cellar/<beverage_id>
+    """
+    def get(self, beverage_id) -> json:
+        """Return each location for the specified beverage, plus the total qty & qty_cold."""
+        logger.debug(f"Request: {request}, for id: {beverage_id}.")
+
+        # Since beverage_id is the hash key, one query returns every location
+        try:
+            locations = [bev.to_dict(dates_as_epoch=True) for bev in Beverage.query(beverage_id)]
+            logger.debug(f"Retrieved {len(locations)} locations for {beverage_id}.")
+
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        if not locations:
+            logger.debug(f"Beverage {beverage_id} not found.")
+            return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+
+        output = {
+            "beverage_id": beverage_id,
+            "qty":         sum(bev['qty'] for bev in locations),
+            "qty_cold":    sum(bev['qty_cold'] for bev in locations),
+            "locations":   locations
+        }
+
+        logger.debug(f"End of BeverageLocationsApi.GET")
+        return {'message': 'Success', 'data': output}, 200
+
+
+class BeverageMoveApi(Resource):
+    """
+    For moving bottles of a beverage from one location to another.
+    Endpoint: /api/v1/cellar/<beverage_id>/move
+    """
+    def post(self, beverage_id) -> json:
+        """
+        Move bottles between locations, e.g. {"from": "Cellar", "to": "Fridge", "qty": 2, "qty_cold": 0}.
+        The destination is created or incremented and the source decremented (or deleted when no
+        bottles remain) in a single transaction.
+        """
+        logger.debug(f"Request: {request}, for id: {beverage_id}.")
+
+        # Ensure there's a body to accompany this request
+        if not request.data:
+            return {'message': 'Error', 'data': 'POST request must contain a body.'}, 400
+
+        # Load & decode the provided JSON
+        try:
+            data = json.loads(request.data.decode())
+            logger.debug(f"Data submitted: {data}")
+
+        except json.JSONDecodeError as e:
+            error_msg = f"Error attempting to decode the provided JSON."
+            logger.debug(f"{error_msg},\n{request.data.__str__()},\n{e}")
+            return {'message': 'Error', 'data': error_msg + f"\n{request.data.__str__()}"}, 400
+
+        if not isinstance(data, dict):
+            return {'message': 'Error', 'data': 'Body must be an object with from, to, and qty.'}, 400
+
+        # Validate the move
+        source, destination = data.get('from'), data.get('to')
+        qty, qty_cold = data.get('qty', 1), data.get('qty_cold', 0)
+        if not source or not destination or not isinstance(source, str) or not isinstance(destination, str):
+            return {'message': 'Error', 'data': 'Both from and to locations must be provided.'}, 400
+        if source == destination:
+            return {'message': 'Error', 'data': 'from and to locations must differ.'}, 400
+        for field, value in (('qty', qty), ('qty_cold', qty_cold)):
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                return {'message': 'Error', 'data': f'{field} must be a non-negative integer.'}, 400
+        if not 0 < qty or qty_cold > qty:
+            return {'message': 'Error', 'data': 'qty must be positive, and at least qty_cold.'}, 400
+
+        try:
+            source_item, destination_item = move_beverage(beverage_id, source, destination, qty, qty_cold)
+
+        except Beverage.DoesNotExist:
+            logger.debug(f"Beverage {beverage_id} not found in {source}.")
+            return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found in {source}.'}, 404
+        except MoveConflict as e:
+            logger.debug(str(e))
+            return {'message': 'Conflict', 'data': str(e)}, 409
+        except TransactWriteError as e:
+            if e.cause_response_code == 'TransactionCanceledException':
+                error_msg = f"Beverage {beverage_id} changed during the move, please retry."
+                logger.debug(f"{error_msg}\n{e}")
+                return {'message': 'Conflict', 'data': error_msg}, 409
+            error_msg = f"Error attempting to move beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to move beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        if source_item is None:
+            cellar_cache.remove(beverage_id, source)
+            record_delete(beverage_id, source)
+            source_output = None
+        else:
+            source_output = source_item.to_dict(dates_as_epoch=True)
+            cellar_cache.upsert(source_output)
+            record_upsert(source_output)
+
+        destination_output = destination_item.to_dict(dates_as_epoch=True)
+        cellar_cache.upsert(destination_output)
+        record_upsert(destination_output)
+
+        logger.info(f"Moved {qty} of beverage {beverage_id} from {source} to {destination}.")
+        logger.debug(f"End of BeverageMoveApi.POST")
+        return {'message': 'Success', 'data': {'from': source_output, 'to': destination_output}}, 200
+
+
 class BeverageApi(Resource):
     """
     For requesting, updating, or deleting a single beverage from the database.
     Endpoint: /api/v1/cellar/<beverage_id>/<location>
     """
     def get(self, beverage_id, location) -> json:
-        """Return the specified beverage."""
+        """
+        Return the specified beverage, limited to the requested `fields` when provided.
+        Returns 304 when the beverage's ETag matches If-None-Match.
+        """
         logger.debug(f"Request: {request}, for id: {beverage_id}, loc: {location}.")
 
+        try:
+            fields = parse_fields(request.args.get('fields'))
+        except ValueError as e:
+            logger.debug(f"Invalid fields requested: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
         # Retrieve specified beverage from the database
         try:
-            beverage = Beverage.get(beverage_id, location)
+            beverage = Beverage.get(beverage_id, location,
+                                    attributes_to_get=list(dict.fromkeys(fields + ['version'])) if fields else None)
             logger.debug(f"Retrieved beverage: {beverage}")
-            return {'message': 'Success', 'data': beverage.to_dict(dates_as_epoch=True)}, 200
+
+            headers = {'ETag': etag(beverage.version)}
+            if not_modified(headers['ETag']):
+                logger.debug(f"End of BeverageApi.GET, not modified.")
+                return None, 304, headers
+            return {'message': 'Success', 'data': beverage.to_dict(dates_as_epoch=True, fields=fields)}, \
+                200, headers
 
         except Beverage.DoesNotExist:
             logger.debug(f"Beverage {beverage_id} not found.")
@@ -115,9 +686,17 @@ class BeverageApi(Resource):
             return {'message': 'Error', 'data': error_msg}, 500
 
     def put(self, beverage_id, location) -> json:
-        """Update the specified beverage."""
+        """
+        Update the specified beverage.
+        When an If-Match header is provided, the update only applies if the beverage's ETag matches.
+        """
         logger.debug(f"Request: {request}, for id: {beverage_id}, loc: {location}.")
 
+        try:
+            condition = if_match_condition(Beverage)
+        except PreconditionFailed as e:
+            return self._precondition_failed(beverage_id, str(e))
+
         # Ensure there's a body to accompany this request
         if not request.data:
             return {'message': 'Error', 'data': 'PUT request must contain a body.'}, 400
@@ -162,44 +741,253 @@ class BeverageApi(Resource):
         # Save to the database
         try:
             logger.debug(f"Saving {beverage} to the db...")
-            beverage.save()
+            beverage.replace(condition=condition)
             logger.info(f"Beverage updated: {beverage})")
+
+            output = beverage.to_dict(dates_as_epoch=True)
+            cellar_cache.upsert(output)
+            record_upsert(output)
             logger.debug(f"End of BeverageApi.PUT")
-            return {'message': 'Success', 'data': beverage.to_dict(dates_as_epoch=True)}, 200
-        except Beverage.DoesNotExist:
-            logger.debug(f"Beverage {beverage_id} not found.")
-            return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+            return {'message': 'Success', 'data': output}, 200, {'ETag': etag(beverage.version)}
+        except UpdateError as e:
+            if e.cause_response_code == 'ConditionalCheckFailedException':
+                return self._precondition_failed(beverage_id)
+            error_msg = f"Error attempting to save beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
         except PynamoDBException as e:
             error_msg = f"Error attempting to save beverage {beverage_id}."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
 
+    def patch(self, beverage_id, location) -> json:
+        """
+        Update only the attributes provided in the body of the request.
+        When an If-Match header is provided, the update only applies if the beverage's ETag matches.
+        """
+        logger.debug(f"Request: {request}, for id: {beverage_id}, loc: {location}.")
+
+        try:
+            condition = if_match_condition(Beverage)
+        except PreconditionFailed as e:
+            return self._precondition_failed(beverage_id, str(e))
+
+        # Ensure there's a body to accompany this request
+        if not request.data:
+            return {'message': 'Error', 'data': 'PATCH request must contain a body.'}, 400
+
+        # Load & decode the provided JSON
+        try:
+            data = json.loads(request.data.decode())
+            logger.debug(f"Data submitted: {data}")
+
+        except json.JSONDecodeError as e:
+            error_msg = f"Error attempting to decode the provided JSON."
+            logger.debug(f"{error_msg},\n{request.data.__str__()},\n{e}")
+            return {'message': 'Error', 'data': error_msg + f"\n{request.data.__str__()}"}, 400
+
+        if not isinstance(data, dict) or not data:
+            return {'message': 'Error', 'data': 'PATCH body must contain the attributes to update.'}, 400
+
+        # Keys may be included in the body, but must match the endpoint
+        for field, value in (('beverage_id', beverage_id), ('location', location)):
+            if field in data:
+                if str(data.pop(field)) != str(value):
+                    error_msg = f"{field} provided in the body doesn't match the endpoint ({value})."
+                    logger.debug(error_msg)
+                    return {'message': 'Error', 'data': error_msg}, 400
+
+        # Convert the changes into update actions
+        try:
+            actions = Beverage.update_actions(data)
+        except (KeyError, ValueError) as e:
+            error_msg = f"Invalid update: {e.args[0]}"
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        # Apply the changes in a single request, without creating a new item
+        try:
+            beverage = Beverage(beverage_id=beverage_id, location=location, _user_instantiated=False)
+            beverage.update(actions=actions,
+                            condition=condition if condition is not None else Beverage.beverage_id.exists())
+            logger.info(f"Beverage updated: {beverage}")
+
+        except UpdateError as e:
+            if e.cause_response_code == 'ConditionalCheckFailedException':
+                return self._not_found_or_precondition_failed(beverage_id, location, condition)
+            error_msg = f"Error attempting to update beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to update beverage {beverage_id}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        output = beverage.to_dict(dates_as_epoch=True)
+        cellar_cache.upsert(output)
+        record_upsert(output)
+        logger.debug(f"End of BeverageApi.PATCH")
+        return {'message': 'Success', 'data': output}, 200, {'ETag': etag(beverage.version)}
+
     def delete(self, beverage_id, location) -> json:
-        """Delete the specified beverage."""
+        """
+        Delete the specified beverage, in a single conditional request.
+        When an If-Match header is provided, the beverage is only deleted if its ETag matches.
+        """
         logger.debug(f"Request: {request}, for id: {beverage_id}, loc: {location}.")
 
-        # Retrieve this beverage from the database
         try:
-            beverage = Beverage.get(beverage_id, location)
-            logger.debug(f"Retrieved beverage: {beverage}")
+            condition = if_match_condition(Beverage)
+        except PreconditionFailed as e:
+            return self._precondition_failed(beverage_id, str(e))
+
+        try:
+            beverage = Beverage(beverage_id=beverage_id, location=location, _user_instantiated=False)
+            deleted = beverage.delete_returning(condition=condition)
 
         except Beverage.DoesNotExist:
-            logger.debug(f"Beverage {beverage_id} not found.")
-            return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+            return self._not_found_or_precondition_failed(beverage_id, location, condition)
         except PynamoDBException as e:
-            error_msg = f"Error attempting to retrieve beverage {beverage_id}."
+            error_msg = f"Error attempting to delete beverage {beverage_id}."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
 
-        # Delete the specified beverage
+        footprint = f"{deleted}"
+        cellar_cache.remove(beverage_id, location)
+        record_delete(beverage_id, location)
+        logger.info(f"Beverage {footprint} deleted successfully.")
+        logger.debug("End of BeverageApi.DELETE")
+        return {'message': 'Success', 'data': f'{footprint} deleted successfully.'}, 200
+
+    @staticmethod
+    def _precondition_failed(beverage_id, reason=None) -> tuple:
+        """Response for a request whose If-Match header doesn't match the beverage's ETag."""
+        error_msg = reason or f"Beverage {beverage_id} has been modified since it was retrieved."
+        logger.debug(error_msg)
+        return {'message': 'Precondition Failed', 'data': error_msg}, 412
+
+    def _not_found_or_precondition_failed(self, beverage_id, location, condition) -> tuple:
+        """
+        Response for a failed conditional write.  Without an If-Match header the beverage must be
+        missing; otherwise it's read to tell the two apart, which only failed requests pay for.
+        """
+        if condition is not None:
+            try:
+                Beverage.get(beverage_id, location, consistent_read=True, attributes_to_get=['version'])
+                return self._precondition_failed(beverage_id)
+            except Beverage.DoesNotExist:
+                pass
+            except PynamoDBException as e:
+                error_msg = f"Error attempting to retrieve beverage {beverage_id}."
+                logger.debug(f"{error_msg}\n{e}")
+                return {'message': 'Error', 'data': error_msg}, 500
+
+        logger.debug(f"Beverage {beverage_id} not found.")
+        return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+
+
+class BeverageQtyApi(Resource):
+    """
+    For atomically adjusting the quantity of a single beverage, e.g. when drinking a bottle.
+    Endpoint: /api/v1/cellar/<beverage_id>/<location>/qty
+    """
+    def post(self, beverage_id, location) -> json:
+        """
+        Add the provided deltas to qty and/or qty_cold, e.g. {"qty": -1, "qty_cold": -1}.
+        Applied as a single conditional update, which fails (409) if qty would become negative or
+        qty_cold would exceed qty.
+        """
+        logger.debug(f"Request: {request}, for id: {beverage_id}, loc: {location}.")
+
+        # Ensure there's a body to accompany this request
+        if not request.data:
+            return {'message': 'Error', 'data': 'POST request must contain a body.'}, 400
+
+        # Load & decode the provided JSON
+        try:
+            data = json.loads(request.data.decode())
+            logger.debug(f"Data submitted: {data}")
+
+        except json.JSONDecodeError as e:
+            error_msg = f"Error attempting to decode the provided JSON."
+            logger.debug(f"{error_msg},\n{request.data.__str__()},\n{e}")
+            return {'message': 'Error', 'data': error_msg + f"\n{request.data.__str__()}"}, 400
+
+        if not isinstance(data, dict):
+            return {'message': 'Error', 'data': 'Body must be an object of qty and/or qty_cold deltas.'}, 400
+
+        # Validate the deltas
+        deltas = {}
+        for field in ('qty', 'qty_cold'):
+            value = data.pop(field, 0)
+            if isinstance(value, bool) or not isinstance(value, int):
+                return {'message': 'Error', 'data': f'{field} must be an integer.'}, 400
+            deltas[field] = value
+
+        if data:
+            error_msg = f"Unexpected attributes provided: {', '.join(map(str, data))}."
+            logger.debug(error_msg)
+            return {'message': 'Error', 'data': error_msg}, 400
+        if not any(deltas.values()):
+            return {'message': 'Error', 'data': 'At least one non-zero delta must be provided.'}, 400
+
         try:
-            footprint = f"{beverage}"
-            beverage.delete()
-            logger.info(f"Beverage {footprint} deleted successfully.")
-            logger.debug("End of BeverageApi.DELETE")
-            return {'message': 'Success', 'data': f'{footprint} deleted successfully.'}, 200
+            try:
+                condition = Beverage.adjustment_condition(deltas['qty'], deltas['qty_cold'])
+            except ValueError:
+                # Rare case which can't be expressed as a condition; compare against the current values
+                current = Beverage.get(beverage_id, location, consistent_read=True,
+                                       attributes_to_get=['qty', 'qty_cold'])
+                condition = Beverage.adjustment_condition(deltas['qty'], deltas['qty_cold'],
+                                                          current=(current.qty or 0, current.qty_cold or 0))
+                if condition is None:
+                    return self._conflict(beverage_id, current)
+
+            actions = [getattr(Beverage, field).add(delta) for field, delta in deltas.items() if delta]
+            actions.append(Beverage.last_modified.set(datetime.utcnow()))
+
+            beverage = Beverage(beverage_id=beverage_id, location=location, _user_instantiated=False)
+            beverage.update(actions=actions, condition=condition)
+            logger.info(f"Beverage {beverage_id} adjusted by {deltas}: qty {beverage.qty}, "
+                        f"qty_cold {beverage.qty_cold}.")
 
+        except Beverage.DoesNotExist:
+            logger.debug(f"Beverage {beverage_id} not found.")
+            return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+        except UpdateError as e:
+            if e.cause_response_code != 'ConditionalCheckFailedException':
+                error_msg = f"Error attempting to adjust beverage {beverage_id}."
+                logger.debug(f"{error_msg}\n{e}")
+                return {'message': 'Error', 'data': error_msg}, 500
+
+            # Only failed requests pay for a read, to distinguish a missing beverage from a conflict
+            try:
+                current = Beverage.get(beverage_id, location, consistent_read=True,
+                                       attributes_to_get=['qty', 'qty_cold'])
+            except Beverage.DoesNotExist:
+                logger.debug(f"Beverage {beverage_id} not found.")
+                return {'message': 'Not Found', 'data': f'Beverage {beverage_id} not found.'}, 404
+            except PynamoDBException as e:
+                error_msg = f"Error attempting to retrieve beverage {beverage_id}."
+                logger.debug(f"{error_msg}\n{e}")
+                return {'message': 'Error', 'data': error_msg}, 500
+            return self._conflict(beverage_id, current)
         except PynamoDBException as e:
-            error_msg = f"Error attempting to delete beverage: {beverage}."
+            error_msg = f"Error attempting to adjust beverage {beverage_id}."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
+
+        output = beverage.to_dict(dates_as_epoch=True)
+        cellar_cache.upsert(output)
+        record_upsert(output)
+        logger.debug(f"End of BeverageQtyApi.POST")
+        return {'message': 'Success', 'data': output}, 200, {'ETag': etag(beverage.version)}
+
+    @staticmethod
+    def _conflict(beverage_id, current) -> tuple:
+        """Response for an adjustment which would leave qty negative or qty_cold above qty."""
+        error_msg = f"Adjustment would leave beverage {beverage_id} with a negative qty or more " \
+                    f"cold than in total."
+        logger.debug(error_msg)
+        return {'message': 'Conflict', 'data': error_msg,
+                'current': {'qty': current.qty or 0, 'qty_cold': current.qty_cold or 0}}, 409
@@ -1,5 +1,55 @@
-from backend.cellar_routes import CellarCollectionApi, BeverageApi
+from backend.cellar_routes import CellarCollectionApi, BeverageBulkApi, BeverageApi
+from backend.cache import cellar_cache
 from backend.models import Beverage
+from backend.pagination import encode_cursor, DEFAULT_LIMIT
+from flask import Flask
+from flask_restful import Api
+from pynamodb.connection.table import TableConnection
+import pytest
+
+
+@pytest.fixture
+def client():
+    app = Flask("cellar_routes_test")
+    api = Api(app)
+    api.add_resource(CellarCollectionApi, '/api/v1/cellar')
+    api.add_resource(BeverageBulkApi, '/api/v1/cellar/bulk')
+
+    cellar_cache.invalidate()
+    yield app.test_client()
+    cellar_cache.invalidate()
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    """
+    Returns a tuple: (versions returned by each read of the collection version, with the last one
+    repeated; list with an entry per read).
+    """
+    versions = [5]
+    reads = []
+
+    def fake_collection_version():
+        reads.append(1)
+        return versions[min(len(reads), len(versions)) - 1], 0
+
+    monkeypatch.setattr("backend.cellar_routes.collection_version", fake_collection_version)
+    return versions, reads
+
+
+@pytest.fixture
+def scans(monkeypatch, stored_beverage):
+    """Serve two beverages from Scan, recording each request."""
+    scans = []
+
+    def fake_scan(self, **kwargs):
+        scans.append(kwargs)
+        items = [stored_beverage(beverage_id=f"Beverage #{i}", name=f"Gose #{i}") for i in range(2)]
+        return {'Items': items, 'Count': 2, 'ScannedCount': 2}
+
+    monkeypatch.setattr(TableConnection, "scan", fake_scan)
+    monkeypatch.setattr("backend.filters.Config.CELLAR_SCAN_SEGMENTS", 1)
+    return scans
 
 
 class TestCellarCollectionApi:
@@ -10,6 +60,126 @@ class TestCellarCollectionApi:
     def test_post(self):
         pass
 
+    def test_get_cache_miss(self, client, versions, scans):
+        resp = client.get('/api/v1/cellar')
+        assert resp.status_code == 200
+        assert resp.headers['ETag'] == 'W/"5.0"'
+        assert len(resp.json['data']) == 2
+
+        # The version was read before & after the scan, and the cache was loaded with its ETag
+        values, reads = versions
+        assert len(reads) == 2
+        assert cellar_cache.get_all()[1] == 'W/"5.0"'
+
+    def test_get_cache_hit(self, client, versions, scans):
+        values, reads = versions
+        etag = client.get('/api/v1/cellar').headers['ETag']
+        read_count = len(reads)
+
+        # Hits with a matching If-None-Match don't read the version or the beverages
+        resp = client.get('/api/v1/cellar', headers={'If-None-Match': etag})
+        assert resp.status_code == 304
+        assert resp.headers['ETag'] == etag
+        assert len(reads) == read_count
+        assert len(scans) == 1
+
+        # After a local write patches the cache, it's served without an ETag, so can't return 304
+        cellar_cache.upsert({"beverage_id": "Beverage #2", "location": "Home"})
+        resp = client.get('/api/v1/cellar', headers={'If-None-Match': etag})
+        assert resp.status_code == 200
+        assert 'ETag' not in resp.headers
+        assert len(resp.json['data']) == 3
+        assert len(scans) == 1
+
+    def test_get_changed_during_scan(self, client, versions, scans):
+        # The version changed between the reads before & after the scan
+        values, reads = versions
+        values[:] = [5, 6]
+        resp = client.get('/api/v1/cellar')
+        assert resp.status_code == 200
+        assert 'ETag' not in resp.headers
+        assert cellar_cache.get_all() == (None, None)
+
+
+    def test_get_cursor_without_limit(self, client, versions, scans):
+        cursor = encode_cursor({"beverage_id": {"S": "Beverage #1"}, "location": {"S": "Home"}})
+
+        # A cursor alone still reads one bounded page
+        resp = client.get(f'/api/v1/cellar?cursor={cursor}')
+        assert resp.status_code == 200
+        assert 'next_cursor' in resp.json
+        assert scans[-1]['limit'] == DEFAULT_LIMIT
+
+        # An empty cursor is ignored
+        resp = client.get('/api/v1/cellar?cursor=')
+        assert 'next_cursor' not in resp.json
+
+
+def new_beverage(beverage_id, **attributes) -> dict:
+    return {"beverage_id": beverage_id, "producer": "Westbrook", "name": "Gose", "year": 2013, "size": "12 oz",
+            "location": "Home", **attributes}
+
+
+class TestBeverageBulkApi:
+    @pytest.fixture
+    def table(self, monkeypatch):
+        """
+        Fake batch reads & writes.  Beverages named "Exists*" are already stored, reads of "Unchecked*"
+        are never processed, and writes of "Stubborn*" never succeed.  Returns the items written.
+        """
+        written = []
+
+        def fake_batch_get_item(self, keys, **kwargs):
+            found = [key for key in keys if key['beverage_id']['S'].startswith("Exists")]
+            unprocessed = [key for key in keys if key['beverage_id']['S'].startswith("Unchecked")]
+            return {'Responses': {'Cellar': found},
+                    'UnprocessedKeys': {'Cellar': {'Keys': unprocessed}} if unprocessed else {}}
+
+        def fake_batch_write_item(self, put_items=None, delete_items=None, **kwargs):
+            unprocessed = [{'PutRequest': {'Item': item}} for item in put_items
+                           if item['beverage_id']['S'].startswith("Stubborn")]
+            written.extend(item for item in put_items if not item['beverage_id']['S'].startswith("Stubborn"))
+            return {'UnprocessedItems': {'Cellar': unprocessed}} if unprocessed else {}
+
+        monkeypatch.setattr(TableConnection, "batch_get_item", fake_batch_get_item)
+        monkeypatch.setattr(TableConnection, "batch_write_item", fake_batch_write_item)
+        monkeypatch.setattr("backend.batching.backoff", lambda retries: None)
+        monkeypatch.setattr(Beverage.Meta, "base_backoff_ms", 1, raising=False)
+        monkeypatch.setattr(Beverage.Meta, "max_retry_attempts", 1, raising=False)
+        monkeypatch.setattr("backend.cellar_routes.record_upserts", lambda beverages: None)
+        return written
+
+    def test_post_created(self, client, table):
+        resp = client.post('/api/v1/cellar/bulk', json=[new_beverage("New #1"), new_beverage("New #2")])
+        assert resp.status_code == 201
+        assert [result['status'] for result in resp.json['data']] == [201, 201]
+
+        # New beverages are written with the first version
+        assert [result['data']['version'] for result in resp.json['data']] == [1, 1]
+        assert [item['version'] for item in table] == [{'N': '1'}, {'N': '1'}]
+
+    def test_post_multi_status(self, client, table):
+        body = [
+            new_beverage("New #1"),
+            "Not a beverage",
+            {"name": "Gose"},
+            new_beverage("New #1"),
+            new_beverage("Exists #1"),
+            new_beverage("Unchecked #1"),
+            new_beverage("Stubborn #1")
+        ]
+        resp = client.post('/api/v1/cellar/bulk', json=body)
+        assert resp.status_code == 207
+
+        # A result for each item, in the order provided
+        results = resp.json['data']
+        assert [result['index'] for result in results] == list(range(len(body)))
+        assert [result['status'] for result in results] == [201, 400, 400, 400, 409, 500, 500]
+        assert results[3]['data'] == "Duplicate of beverage #0."
+
+        # Only the new beverage was written; existing & unchecked beverages weren't overwritten
+        assert [item['beverage_id']['S'] for item in table] == ["New #1"]
+
 
 class TestBeverageApi:
     # TODO: Write BeverageApi unit tests!
@@ -0,0 +1,187 @@
+"""
+Records writes to the Cellar table in the CellarChanges log, and reads them back for delta syncs.
+Each write also bumps the collection's version, used as the ETag for the entire cellar.
+"""
+from backend.global_logger import logger
+from backend.config import Config
+from backend.batching import batch_save
+from backend.models import BeverageChange, CellarVersion
+from pynamodb.exceptions import PynamoDBException
+from datetime import datetime, timedelta
+import json
+
+
+class SyncWindowExpired(Exception):
+    """The requested `since` is older than the change log's retention; clients must do a full sync."""
+    pass
+
+
+def now_epoch_ms() -> float:
+    """Current time in ms, calculated the same way as Beverage.to_dict()."""
+    return datetime.utcnow().timestamp() * 1000
+
+
+def day_of(epoch_ms) -> str:
+    """UTC date (YYYY-MM-DD) for the provided epoch, in ms."""
+    return datetime.utcfromtimestamp(epoch_ms / 1000).date().isoformat()
+
+
+def day_buckets(since_ms, until_ms) -> list:
+    """List of each UTC date from `since_ms` through `until_ms`, inclusive."""
+    day = datetime.utcfromtimestamp(since_ms / 1000).date()
+    last_day = datetime.utcfromtimestamp(until_ms / 1000).date()
+
+    output = []
+    while day <= last_day:
+        output.append(day.isoformat())
+        day += timedelta(days=1)
+    return output
+
+
+def change_id(changed_at, beverage_id, location) -> str:
+    """Range key for a change; sorts chronologically within each day."""
+    return f"{int(changed_at):013d}_{beverage_id}_{location}"
+
+
+# Key of the CellarVersion entry
+VERSION_KEY = ("version", "cellar")
+
+
+def _bump_version(changes, changed_at) -> None:
+    """Increment the collection version by the number of changes written."""
+    try:
+        CellarVersion(*VERSION_KEY).update(actions=[CellarVersion.version.add(changes),
+                                                    CellarVersion.last_modified.set(int(changed_at))])
+    except PynamoDBException as e:
+        logger.error(f"Unable to update the cellar's version.\n{e}")
+
+
+def collection_version() -> tuple:
+    """
+    Return the collection version as a tuple: (number of writes, epoch of the latest write in ms).
+    Returns (0, None) before anything has been written.
+    """
+    try:
+        version = CellarVersion.get(*VERSION_KEY, consistent_read=True)
+    except CellarVersion.DoesNotExist:
+        return 0, None
+    return int(version.version), version.last_modified
+
+
+def _save(change) -> None:
+    try:
+        change.save()
+        logger.debug(f"Recorded change: {change}")
+    except PynamoDBException as e:
+        # The write itself already succeeded, so don't fail the request
+        logger.error(f"Unable to record change {change} in the change log.\n{e}")
+
+
+def _upsert_change(beverage, changed_at) -> BeverageChange:
+    return BeverageChange(day=day_of(changed_at),
+                          change_id=change_id(changed_at, beverage['beverage_id'], beverage['location']),
+                          beverage_id=beverage['beverage_id'],
+                          location=beverage['location'],
+                          changed_at=changed_at,
+                          deleted=False,
+                          data=json.dumps(beverage),
+                          expires=timedelta(days=Config.CHANGE_LOG_RETENTION_DAYS))
+
+
+def record_upsert(beverage) -> None:
+    """
+    Record that the provided beverage (output from `Beverage.to_dict()`) was created or updated.
+    Changes are stamped with the server's time, since `last_modified` can be provided by clients.
+    """
+    change = _upsert_change(beverage, now_epoch_ms())
+    _save(change)
+    _bump_version(1, change.changed_at)
+
+
+def record_upserts(beverages) -> None:
+    """Record changes for a list of beverages using batch writes."""
+    changed_at = now_epoch_ms()
+    changes = [_upsert_change(beverage, changed_at) for beverage in beverages]
+    if not changes:
+        return
+    _bump_version(len(changes), changed_at)
+
+    try:
+        failed = batch_save(BeverageChange, changes)
+    except PynamoDBException as e:
+        logger.error(f"Unable to record {len(changes)} changes in the change log.\n{e}")
+        return
+
+    if failed:
+        logger.error(f"Unable to record {len(failed)} changes in the change log: {failed}")
+
+
+def record_delete(beverage_id, location) -> None:
+    """Record that the specified beverage was deleted."""
+    changed_at = now_epoch_ms()
+    _save(BeverageChange(day=day_of(changed_at),
+                         change_id=change_id(changed_at, beverage_id, location),
+                         beverage_id=beverage_id,
+                         location=location,
+                         changed_at=changed_at,
+                         deleted=True,
+                         expires=timedelta(days=Config.CHANGE_LOG_RETENTION_DAYS)))
+    _bump_version(1, changed_at)
+
+
+def merge_changes(changes) -> tuple:
+    """
+    Collapse a chronological list of changes into the latest state for each beverage.
+    Returns a tuple: (list of updated beverages, list of tombstones for deleted beverages).
+    """
+    latest = {}
+    for change in changes:
+        latest[(change.beverage_id, change.location)] = change
+
+    updated = []
+    deleted = []
+    for change in latest.values():
+        if change.deleted:
+            deleted.append({
+                "beverage_id": change.beverage_id,
+                "location":    change.location,
+                "deleted_at":  change.changed_at
+            })
+        else:
+            updated.append(json.loads(change.data))
+
+    return updated, deleted
+
+
+def changes_since(since_ms) -> tuple:
+    """
+    Query the change log for everything modified after `since_ms`.
+    Returns a tuple: (updated beverages, tombstones, epoch to use as the next `since`, in ms).
+    The returned epoch lags behind this query by CHANGE_LOG_SYNC_OVERLAP seconds, so consecutive
+    syncs overlap and pick up changes which were stamped before the query but logged after it.
+    A `since_ms` slightly in the future (within the overlap, e.g. from another instance's clock) is
+    treated as now.
+    Raises SyncWindowExpired when `since_ms` is older than the change log's retention period, or
+    ValueError when it's further in the future.
+    """
+    now = now_epoch_ms()
+    oldest_allowed = now - timedelta(days=Config.CHANGE_LOG_RETENTION_DAYS).total_seconds() * 1000
+    if since_ms < oldest_allowed:
+        raise SyncWindowExpired(f"Changes before {oldest_allowed} are no longer available.")
+    if since_ms > now + Config.CHANGE_LOG_SYNC_OVERLAP * 1000:
+        raise ValueError(f"Since can't be in the future: {since_ms}.")
+
+    since_ms = min(since_ms, now)
+    as_of = max(now - Config.CHANGE_LOG_SYNC_OVERLAP * 1000, since_ms)
+
+    # Read each day's partition, starting from the millisecond of `since_ms`
+    changes = []
+    start_key = f"{int(since_ms):013d}"
+    for day in day_buckets(since_ms, now):
+        for change in BeverageChange.query(day, BeverageChange.change_id >= start_key):
+            if change.changed_at > since_ms:
+                changes.append(change)
+
+    logger.debug(f"Found {len(changes)} changes since {since_ms}.")
+    updated, deleted = merge_changes(changes)
+    return updated, deleted, as_of
@@ -0,0 +1,103 @@
+from backend.changelog import day_buckets, day_of, change_id, merge_changes, changes_since, \
+    now_epoch_ms, record_upsert, record_delete, collection_version, SyncWindowExpired
+from backend.config import Config
+from backend.models import BeverageChange
+from pynamodb.connection.table import TableConnection
+from datetime import datetime
+import json
+import pytest
+
+
+def make_change(beverage_id, changed_at, deleted=False, qty=1) -> BeverageChange:
+    data = None if deleted else json.dumps({"beverage_id": beverage_id, "location": "Home", "qty": qty})
+    return BeverageChange(day=day_of(changed_at),
+                          change_id=change_id(changed_at, beverage_id, "Home"),
+                          beverage_id=beverage_id,
+                          location="Home",
+                          changed_at=changed_at,
+                          deleted=deleted,
+                          data=data)
+
+
+class TestChangeLog:
+    def test_day_buckets(self):
+        start = datetime.fromisoformat("2020-04-10T23:00:00").timestamp() * 1000
+        end = datetime.fromisoformat("2020-04-12T01:00:00").timestamp() * 1000
+        assert day_buckets(start, end) == ["2020-04-10", "2020-04-11", "2020-04-12"]
+        assert day_buckets(start, start) == ["2020-04-10"]
+
+    def test_change_id_sorting(self):
+        # Range keys must sort chronologically
+        earlier = change_id(999999999999, "Zymatore_IPA", "Home")
+        later = change_id(1586622254147.498, "Allagash_Coolship", "Home")
+        assert earlier < later
+        assert later.startswith("1586622254147_")
+
+    def test_merge_changes(self):
+        changes = [
+            make_change("a", 1000, qty=1),
+            make_change("b", 1001),
+            make_change("a", 1002, qty=5),
+            make_change("b", 1003, deleted=True),
+            make_change("c", 1004, deleted=True),
+            make_change("c", 1005, qty=2)
+        ]
+        updated, deleted = merge_changes(changes)
+
+        # Only the latest state of each beverage is returned
+        assert sorted(bev['beverage_id'] for bev in updated) == ["a", "c"]
+        assert {"beverage_id": "a", "location": "Home", "qty": 5} in updated
+        assert deleted == [{"beverage_id": "b", "location": "Home", "deleted_at": 1003}]
+
+    def test_expired_window(self):
+        with pytest.raises(SyncWindowExpired):
+            changes_since(0)
+
+        with pytest.raises(SyncWindowExpired):
+            changes_since(now_epoch_ms() - 1000 * 60 * 60 * 24 * 365)
+
+    def test_collection_version(self, monkeypatch):
+        updates = []
+
+        def fake_update_item(self, hash_key, range_key=None, actions=None, **kwargs):
+            updates.append((hash_key, range_key, [str(action) for action in actions]))
+            return {"Attributes": {}}
+
+        monkeypatch.setattr(TableConnection, "put_item", lambda self, *args, **kwargs: {})
+        monkeypatch.setattr(TableConnection, "update_item", fake_update_item)
+        monkeypatch.setattr(TableConnection, "get_item", lambda self, *args, **kwargs: {})
+
+        # Nothing written yet
+        assert collection_version() == (0, None)
+
+        # Each recorded write bumps the version, using the server's time rather than `last_modified`
+        before = int(now_epoch_ms())
+        record_upsert({"beverage_id": "a", "location": "Home", "last_modified": 1000})
+        record_delete("a", "Home")
+        assert len(updates) == 2
+        hash_key, range_key, actions = updates[0]
+        assert (hash_key, range_key, actions[0]) == ("version", "cellar", "version {'N': '1'}")
+        assert before <= int(actions[1].split("'")[-2]) <= now_epoch_ms()
+
+    def test_sync_overlap(self, monkeypatch):
+        monkeypatch.setattr(BeverageChange, "query", lambda *args, **kwargs: iter([]))
+
+        # Each sync's `as_of` lags behind the query, so the next sync overlaps it
+        before = now_epoch_ms()
+        updated, deleted, as_of = changes_since(before - 60 * 1000)
+        assert as_of == pytest.approx(before - Config.CHANGE_LOG_SYNC_OVERLAP * 1000, abs=1000)
+
+        # But never moves backwards
+        assert changes_since(before)[2] == before
+
+    def test_future_since(self, monkeypatch):
+        monkeypatch.setattr(BeverageChange, "query", lambda *args, **kwargs: iter([]))
+
+        # Slightly ahead (e.g. another instance's clock) is treated as now, so `as_of` isn't in the future
+        now = now_epoch_ms()
+        assert changes_since(now + 1000)[2] <= now_epoch_ms()
+
+        # Further ahead is rejected, including epochs beyond the range of datetime
+        for since in (now + 60 * 60 * 1000, 1e15, 1e300):
+            with pytest.raises(ValueError):
+                changes_since(since)
@@ -0,0 +1,123 @@
+"""
+Negotiated compression of API responses.
+Responses are encoded with brotli (when it's installed) or gzip, as allowed by the request's
+Accept-Encoding header.  Buffered responses are only compressed above a minimum size; streamed
+responses (e.g. exports) are compressed as they're sent, flushing often enough to keep them streaming.
+Strong ETags must differ between encodings, so those of compressed responses are weakened, other
+than item version ETags: clients send those back in If-Match, which requires a strong ETag.
+"""
+from backend.config import Config
+from flask import request
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {'application/json', 'application/x-ndjson', 'text/csv', 'text/html', 'text/plain'}
+
+GZIP_LEVEL = 6
+# Higher qualities are too slow for compressing responses on the fly
+BROTLI_QUALITY = 5
+
+# Uncompressed bytes of a streamed response buffered by the compressor before it's flushed
+STREAM_FLUSH_SIZE = 16 * 1024
+
+
+class _GzipCompressor(object):
+    def __init__(self):
+        # wbits of 16 + 15 writes a gzip header & trailer around the deflate stream
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor(object):
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+COMPRESSORS = {'gzip': _GzipCompressor}
+if brotli is not None:
+    COMPRESSORS = {'br': _BrotliCompressor, **COMPRESSORS}
+
+
+def negotiate_encoding(accept_encodings) -> str:
+    """Return the supported encoding preferred by the Accept-Encoding header, or None for identity."""
+    return accept_encodings.best_match(list(COMPRESSORS))
+
+
+def compress_stream(chunks, compressor):
+    """
+    Generator compressing each chunk of a streamed response.  Output is flushed after the first chunk,
+    so the client receives it right away, and then whenever STREAM_FLUSH_SIZE bytes are pending.
+    """
+    first, pending = True, 0
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        pending += len(chunk)
+        if first or pending >= STREAM_FLUSH_SIZE:
+            data += compressor.flush()
+            first, pending = False, 0
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress_response(response):
+    """
+    after_request handler which compresses the response when the client accepts an encoding we
+    support.  Skips small, non-text, partial & already encoded responses.
+    """
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    response.vary.add('Accept-Encoding')
+
+    if request.method == 'HEAD' or response.direct_passthrough or 'Content-Encoding' in response.headers \
+            or response.status_code < 200 or response.status_code in (204, 206, 304):
+        return response
+
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+
+    compressor = COMPRESSORS[encoding]()
+    if response.is_streamed:
+        # Closing the response must still close the original iterable, e.g. to end its request context
+        if hasattr(response.response, 'close'):
+            response.call_on_close(response.response.close)
+        response.response = compress_stream(response.iter_encoded(), compressor)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < Config.COMPRESSION_MIN_SIZE:
+            return response
+        response.set_data(compressor.compress(data) + compressor.finish())
+
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def _weaken_etag(response) -> None:
+    """Mark a compressed response's strong ETag as weak, unless it's an item version (see preconditions.etag)."""
+    tag, weak = response.get_etag()
+    if tag and not weak and not tag.isdigit():
+        response.set_etag(tag, weak=True)
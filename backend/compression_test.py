@@ -0,0 +1,99 @@
+from backend.compression import compress_response, compress_stream, _GzipCompressor
+from backend.config import Config
+from flask import Flask, Response, jsonify
+import gzip
+import json
+import pytest
+import zlib
+
+ROWS = [{'producer': 'Westbrook', 'name': f'Gose #{i}', 'size': '12 oz', 'location': 'Home'} for i in range(200)]
+
+
+@pytest.fixture
+def client():
+    app = Flask("compression_test")
+
+    @app.route('/rows')
+    def rows():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify(ROWS[0])
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson')
+
+    @app.route('/tagged/<tag>')
+    def tagged(tag):
+        response = jsonify(ROWS)
+        response.set_etag(tag)
+        return response
+
+    @app.route('/image')
+    def image():
+        return Response(b'\x89PNG' * 1000, mimetype='image/png')
+
+    app.after_request(compress_response)
+    return app.test_client()
+
+
+class TestCompression:
+    def test_compress_response(self, client):
+        resp = client.get('/rows', headers={'Accept-Encoding': 'gzip, deflate'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert resp.headers['Vary'] == 'Accept-Encoding'
+        assert int(resp.headers['Content-Length']) == len(resp.data)
+        assert json.loads(gzip.decompress(resp.data)) == ROWS
+
+    def test_etags(self, client):
+        # Strong ETags of compressed responses are weakened, since they'd otherwise match the identity encoding
+        resp = client.get('/tagged/abc123', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['ETag'] == 'W/"abc123"'
+        resp = client.get('/tagged/abc123')
+        assert resp.headers['ETag'] == '"abc123"'
+
+        # Except item versions, which are required to be strong for If-Match
+        resp = client.get('/tagged/5', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['ETag'] == '"5"'
+
+    def test_skipped(self, client):
+        # Not accepted by the client
+        resp = client.get('/rows')
+        assert 'Content-Encoding' not in resp.headers
+        assert resp.headers['Vary'] == 'Accept-Encoding'
+        assert resp.json == ROWS
+
+        resp = client.get('/rows', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        assert 'Content-Encoding' not in resp.headers
+
+        # Below the minimum size
+        assert len(client.get('/small').data) < Config.COMPRESSION_MIN_SIZE
+        resp = client.get('/small', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in resp.headers
+
+        # Not compressible
+        resp = client.get('/image', headers={'Accept-Encoding': 'gzip'})
+        assert 'Content-Encoding' not in resp.headers
+        assert 'Vary' not in resp.headers
+
+    def test_compress_streamed_response(self, client):
+        resp = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        assert resp.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in resp.headers
+
+        lines = gzip.decompress(resp.data).decode().splitlines()
+        assert [json.loads(line) for line in lines] == ROWS
+
+    def test_compress_stream_flushes(self):
+        chunks = [(json.dumps(row) + '\n').encode() for row in ROWS]
+        output = compress_stream(iter(chunks), _GzipCompressor())
+
+        # The first chunk can be decompressed as soon as it's sent, before the stream ends
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        assert decompressor.decompress(next(output)) == chunks[0]
+
+        for data in output:
+            decompressor.decompress(data)
+        assert decompressor.eof
@@ -30,6 +30,33 @@ class Config(object):
     WHITELISTED_ORIGINS = environ.get('WHITELISTED_ORIGINS')
     SECRET_KEY = environ.get('SECRET_KEY') or '0y4TJIyEjH8ZVkXPMGBiFEcHk8tdfe57kE1IJhvR1yb1cmWY'
 
+    # Number of segments (and concurrent threads) used when scanning an entire table
+    CELLAR_SCAN_SEGMENTS = int(environ.get('CELLAR_SCAN_SEGMENTS') or 4)
+    PICKLIST_SCAN_SEGMENTS = int(environ.get('PICKLIST_SCAN_SEGMENTS') or 1)
+
+    # In-process cache of the cellar inventory; TTL is in seconds
+    CELLAR_CACHE_TTL = int(environ.get('CELLAR_CACHE_TTL') or 60)
+    CELLAR_CACHE_MAX_ITEMS = int(environ.get('CELLAR_CACHE_MAX_ITEMS') or 5000)
+
+    # In-process cache of the picklists, refreshed in the background after the TTL (seconds)
+    PICKLIST_CACHE_TTL = int(environ.get('PICKLIST_CACHE_TTL') or 300)
+    # How long browsers may reuse picklists without revalidating (seconds)
+    PICKLIST_MAX_AGE = int(environ.get('PICKLIST_MAX_AGE') or 3600)
+
+    # Days of history kept in the change log for delta syncs
+    CHANGE_LOG_RETENTION_DAYS = int(environ.get('CHANGE_LOG_RETENTION_DAYS') or 30)
+    # Seconds by which each delta sync overlaps the previous one, covering changes logged late & clock skew
+    CHANGE_LOG_SYNC_OVERLAP = int(environ.get('CHANGE_LOG_SYNC_OVERLAP') or 10)
+
+    # Responses to requests with an Idempotency-Key header are replayed for retries within the TTL (seconds)
+    IDEMPOTENCY_TTL = int(environ.get('IDEMPOTENCY_TTL') or 86400)
+    IDEMPOTENCY_MAX_ITEMS = int(environ.get('IDEMPOTENCY_MAX_ITEMS') or 1000)
+    # Also store them in DynamoDB, so retries handled by another instance of the app are answered
+    IDEMPOTENCY_USE_TABLE = (environ.get('IDEMPOTENCY_USE_TABLE') or '').lower() in ('1', 'true', 'yes')
+
+    # Responses smaller than this (in bytes) aren't compressed; streamed responses always are
+    COMPRESSION_MIN_SIZE = int(environ.get('COMPRESSION_MIN_SIZE') or 1024)
+
     if SECRET_KEY != environ.get('SECRET_KEY'):
         logger.warning("Error loading SECRET_KEY!  Temporarily using a hard-coded key.")
 
@@ -0,0 +1,79 @@
+"""
+Streaming exports of the cellar inventory.
+Beverages are serialized one at a time as the paginated read returns them, so memory stays flat
+however large the cellar is, and the first bytes reach the client after the first page is read.
+"""
+from backend.global_logger import logger
+from backend.filters import read_beverages
+from backend.models import Beverage
+from pynamodb.exceptions import PynamoDBException
+import csv
+import json
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+CSV_MIMETYPE = 'text/csv'
+
+# Columns of the cellar spreadsheet, as read by data/csv_to_dictionary.py
+CSV_FIELDS = ("producer", "name", "year", "batch", "size", "bottle_date", "location", "style",
+              "specific_style", "qty", "for_trade", "untappd", "note")
+
+# Attributes read for CSV exports: the columns, plus the keys
+CSV_READ_FIELDS = list(Beverage.KEY_FIELDS) + list(CSV_FIELDS)
+
+
+def iter_beverages(filters=None, fields=None):
+    """
+    Return an iterator of serialized beverages matching the filters, read one page at a time.
+    The first page is read before returning, so errors reading the table are raised to the caller
+    rather than part way through a response.
+    """
+    beverages = iter(read_beverages(filters or {}, paginate=True, fields=fields))
+    first = next(beverages, None)
+
+    def generate():
+        if first is None:
+            return
+        yield first.to_dict(dates_as_epoch=True, fields=fields)
+
+        count = 1
+        try:
+            for beverage in beverages:
+                yield beverage.to_dict(dates_as_epoch=True, fields=fields)
+                count += 1
+        except PynamoDBException as e:
+            # Headers have already been sent, so all that can be done is to end the export early
+            logger.error(f"Export ended early after {count} beverages.\n{e}")
+            raise
+        logger.debug(f"Exported {count} beverages.")
+
+    return generate()
+
+
+def iter_ndjson(beverages):
+    """Generator yielding each serialized beverage as one line of JSON."""
+    for beverage in beverages:
+        yield json.dumps(beverage, separators=(',', ':')) + '\n'
+
+
+class _Echo(object):
+    """File-like object which returns what's written, so csv.writer can format one row at a time."""
+    @staticmethod
+    def write(value) -> str:
+        return value
+
+
+def _csv_value(field, value) -> str:
+    """Format a value the way the spreadsheet stores it: blanks for missing values and False."""
+    if value is None:
+        return ''
+    if field == "for_trade":
+        return 'TRUE' if value else ''
+    return value
+
+
+def iter_csv(beverages):
+    """Generator yielding the header row, then one row of CSV_FIELDS per serialized beverage."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for beverage in beverages:
+        yield writer.writerow([_csv_value(field, beverage.get(field)) for field in CSV_FIELDS])
@@ -0,0 +1,72 @@
+from backend.exports import iter_beverages, iter_ndjson, iter_csv, CSV_FIELDS, CSV_READ_FIELDS
+from pynamodb.connection.table import TableConnection
+from pynamodb.exceptions import ScanError
+import csv
+import json
+import pytest
+
+
+@pytest.fixture
+def pages(monkeypatch, stored_beverage):
+    """Serve 3 pages of 2 beverages each from Scan, recording each request."""
+    requests = []
+
+    def stored(i) -> dict:
+        return stored_beverage(beverage_id=f"Beverage #{i}", name=f"Gose #{i}", qty=i)
+
+    def fake_scan(self, exclusive_start_key=None, **kwargs):
+        page = exclusive_start_key['page'] if exclusive_start_key else 0
+        requests.append(page)
+
+        response = {'Items': [stored(page * 2 + i) for i in range(2)], 'Count': 2, 'ScannedCount': 2}
+        if page < 2:
+            response['LastEvaluatedKey'] = {'page': page + 1}
+        return response
+
+    monkeypatch.setattr(TableConnection, "scan", fake_scan)
+    return requests
+
+
+class TestExports:
+    def test_iter_beverages(self, pages):
+        beverages = iter_beverages()
+
+        # Only the first page is read until the export is consumed
+        assert pages == [0]
+        assert [bev['qty'] for bev in beverages] == [0, 1, 2, 3, 4, 5]
+        assert pages == [0, 1, 2]
+
+    def test_iter_beverages_fields(self, pages):
+        beverage = next(iter_beverages(fields=["qty"]))
+        assert set(beverage) == {"beverage_id", "location", "qty"}
+
+    def test_iter_beverages_errors(self, monkeypatch):
+        def failed_scan(self, **kwargs):
+            raise ScanError("Scan failed.")
+
+        monkeypatch.setattr(TableConnection, "scan", failed_scan)
+        with pytest.raises(ScanError):
+            iter_beverages()
+
+    def test_iter_ndjson(self):
+        beverages = [{"beverage_id": "1", "qty": 2}, {"beverage_id": "2", "qty": 0}]
+        lines = list(iter_ndjson(beverages))
+
+        assert lines == ['{"beverage_id":"1","qty":2}\n', '{"beverage_id":"2","qty":0}\n']
+        assert [json.loads(line) for line in lines] == beverages
+
+    def test_iter_csv(self, pages):
+        lines = list(iter_csv(iter_beverages(fields=CSV_READ_FIELDS)))
+
+        # One line per row, with the spreadsheet's header row first
+        assert len(lines) == 7
+        rows = list(csv.DictReader(lines))
+        assert tuple(rows[0]) == CSV_FIELDS
+        assert rows[1] == {"producer": "Westbrook", "name": "Gose #1", "year": "2013", "batch": "", "size": "12 oz",
+                           "bottle_date": "", "location": "Home", "style": "", "specific_style": "", "qty": "1",
+                           "for_trade": "TRUE", "untappd": "", "note": ""}
+
+    def test_iter_csv_quoting(self):
+        lines = list(iter_csv([{"name": 'Gose, "Aged"', "for_trade": True, "note": "Line 1\nLine 2"}]))
+        row = next(csv.DictReader(lines))
+        assert (row["name"], row["for_trade"], row["note"]) == ('Gose, "Aged"', "TRUE", "Line 1\nLine 2")
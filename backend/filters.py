@@ -0,0 +1,139 @@
+"""
+Compiles the filter parameters accepted by /api/v1/cellar into DynamoDB operations.
+A Query is used when an index is keyed on one of the filters; otherwise the table is Scanned
+with a filter expression.
+"""
+from backend.global_logger import logger
+from backend.config import Config
+from backend.models import Beverage
+from backend.scanning import scan_model
+
+# Query parameters accepted as filters, and the type each value is parsed into
+FILTER_TYPES = {
+    "producer":  str,
+    "style":     str,
+    "location":  str,
+    "for_trade": bool,
+    "year":      int,
+    "in_stock":  bool
+}
+
+# Indexes available for Query-backed filtering: (index, hash key field, range key field)
+INDEXES = [
+    (Beverage.producer_index, "producer", "year"),
+    (Beverage.location_index, "location", "producer")
+]
+
+# Attributes a cursor may contain, with their DynamoDB types: the table's keys plus each index's keys
+CURSOR_KEY_TYPES = {name: Beverage.get_attributes()[name].attr_type
+                    for name in Beverage.KEY_FIELDS + tuple(field for index in INDEXES for field in index[1:])}
+
+
+def _parse_bool(name, value) -> bool:
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError(f"{name} must be true or false, not: {value}.")
+
+
+def parse_filters(args) -> dict:
+    """Return the filters found in the provided query parameters, converted to the proper types."""
+    filters = {}
+    for name, filter_type in FILTER_TYPES.items():
+        value = args.get(name)
+        if value is None or value == "":
+            continue
+
+        if filter_type is bool:
+            filters[name] = _parse_bool(name, value)
+        elif filter_type is int:
+            try:
+                filters[name] = int(value)
+            except ValueError:
+                raise ValueError(f"{name} must be an integer, not: {value}.")
+        else:
+            filters[name] = value
+
+    return filters
+
+
+def _condition_for(name, value):
+    """Condition expression for a single filter."""
+    if name == "in_stock":
+        if value:
+            return Beverage.qty > 0
+        return (Beverage.qty <= 0) | Beverage.qty.does_not_exist()
+    return getattr(Beverage, name) == value
+
+
+def build_condition(filters, exclude=()):
+    """Combine the filters (except those in `exclude`) into one condition, or None if there are none."""
+    condition = None
+    for name, value in filters.items():
+        if name in exclude:
+            continue
+        condition &= _condition_for(name, value)
+    return condition
+
+
+def matches(beverage, filters) -> bool:
+    """Whether a serialized beverage (from `Beverage.to_dict()`) satisfies all filters."""
+    for name, value in filters.items():
+        if name == "in_stock":
+            if (beverage['qty'] > 0) != value:
+                return False
+        elif beverage[name] != value:
+            return False
+    return True
+
+
+def find_index(filters) -> tuple:
+    """
+    Return the (index, hash field, range field) whose hash key is filtered on, if any.
+    Indexes where both keys are filtered on are preferred.
+    """
+    output = None
+    for index, hash_field, range_field in INDEXES:
+        if hash_field in filters:
+            if range_field in filters:
+                return index, hash_field, range_field
+            output = output or (index, hash_field, range_field)
+    return output
+
+
+def read_beverages(filters, paginate=False, limit=None, start_key=None, fields=None):
+    """
+    Return an iterator of the beverages matching the provided filters.
+    When paginating, this is a pynamodb ResultIterator so `last_evaluated_key` is available.
+    """
+    plan = find_index(filters)
+    if plan:
+        index, hash_field, range_field = plan
+        range_condition = None
+        if range_field and range_field in filters:
+            range_condition = _condition_for(range_field, filters[range_field])
+        filter_condition = build_condition(filters, exclude=(hash_field, range_field))
+
+        logger.debug(f"Querying {index.Meta.index_name} for {filters}.")
+        return index.query(filters[hash_field],
+                           range_key_condition=range_condition,
+                           filter_condition=filter_condition,
+                           limit=limit,
+                           page_size=limit,
+                           last_evaluated_key=start_key,
+                           attributes_to_get=fields)
+
+    filter_condition = build_condition(filters)
+    logger.debug(f"Scanning for {filters}.")
+    if paginate:
+        return Beverage.scan(filter_condition=filter_condition,
+                             limit=limit,
+                             page_size=limit,
+                             last_evaluated_key=start_key,
+                             attributes_to_get=fields)
+
+    return scan_model(Beverage,
+                      total_segments=Config.CELLAR_SCAN_SEGMENTS,
+                      filter_condition=filter_condition,
+                      attributes_to_get=fields)
@@ -0,0 +1,56 @@
+from backend.filters import parse_filters, build_condition, matches, find_index
+from backend.models import Beverage
+import pytest
+
+
+class TestFilters:
+    def test_parse_filters(self):
+        args = {"producer": "Westbrook", "year": "2013", "for_trade": "false", "in_stock": "1",
+                "style": "", "unrelated": "ignored"}
+        assert parse_filters(args) == {"producer": "Westbrook", "year": 2013,
+                                       "for_trade": False, "in_stock": True}
+        assert parse_filters({}) == {}
+
+        with pytest.raises(ValueError):
+            parse_filters({"year": "Nineteen Ninety-Seven"})
+
+        with pytest.raises(ValueError):
+            parse_filters({"for_trade": "Maybe"})
+
+    def test_build_condition(self):
+        assert build_condition({}) is None
+
+        condition = build_condition({"producer": "Westbrook", "year": 2013, "in_stock": True})
+        assert "producer" in str(condition)
+        assert "year" in str(condition)
+        assert "qty" in str(condition)
+
+        # Excluded filters aren't part of the condition
+        condition = build_condition({"producer": "Westbrook", "year": 2013}, exclude=("producer",))
+        assert "producer" not in str(condition)
+
+    def test_matches(self):
+        beverage = {"producer": "Westbrook", "style": "Sour", "location": "Home",
+                    "for_trade": True, "year": 2013, "qty": 0}
+
+        assert matches(beverage, {})
+        assert matches(beverage, {"producer": "Westbrook", "year": 2013})
+        assert matches(beverage, {"in_stock": False})
+        assert not matches(beverage, {"in_stock": True})
+        assert not matches(beverage, {"producer": "Westbrook", "location": "Fridge"})
+
+    def test_find_index(self):
+        # Filtering on producer uses the producer-year index
+        index, hash_field, range_field = find_index({"producer": "Westbrook", "year": 2013})
+        assert index is Beverage.producer_index
+        assert (hash_field, range_field) == ("producer", "year")
+
+        # With both keys filtered, the location-producer index is preferred
+        index, hash_field, range_field = find_index({"producer": "Westbrook", "location": "Home"})
+        assert index is Beverage.location_index
+
+        index, hash_field, range_field = find_index({"location": "Home"})
+        assert index is Beverage.location_index
+
+        # No index is keyed on style
+        assert find_index({"style": "Sour"}) is None
@@ -0,0 +1,190 @@
+"""
+Idempotency keys for non-idempotent writes.
+When a request provides an `Idempotency-Key` header, its completed response is stored for a TTL, and
+retries with the same key are answered from the store without writing again.  Responses are kept
+in-process, and optionally in DynamoDB so retries handled by another instance are also answered.
+"""
+from backend.global_logger import logger
+from backend.config import Config
+from backend.models import IdempotencyRecord
+from flask import request
+from pynamodb.exceptions import PynamoDBException
+from collections import OrderedDict
+from datetime import timedelta
+from functools import wraps
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+import json
+
+MAX_KEY_LENGTH = 255
+
+
+class IdempotencyConflict(Exception):
+    """Raised when a request with the same key is still being processed."""
+
+
+class IdempotencyMismatch(Exception):
+    """Raised when a key is reused for a request with a different body."""
+
+
+class IdempotencyStore(object):
+    """
+    Holds completed responses, keyed by the scoped idempotency key, along with a fingerprint of
+    the request they answered.  Keys being processed are tracked so concurrent retries are rejected.
+    """
+    def __init__(self, ttl=86400, max_items=1000, use_table=False):
+        self.ttl = ttl
+        self.max_items = max_items
+        self.use_table = use_table
+
+        self._responses = OrderedDict()
+        self._in_progress = set()
+        self._lock = Lock()
+
+        self.replays = 0
+
+    def begin(self, key, fingerprint):
+        """
+        Start processing a request.  Returns the stored response tuple (body, status, headers) when
+        the request was already completed, otherwise None and the key is marked as in progress.
+        Raises IdempotencyConflict or IdempotencyMismatch.
+        """
+        with self._lock:
+            stored = self._get_local(key)
+            if stored is None and key in self._in_progress:
+                raise IdempotencyConflict("A request with this Idempotency-Key is still being processed.")
+            if stored is None:
+                self._in_progress.add(key)
+
+        if stored is None and self.use_table:
+            stored = self._get_remote(key)
+            if stored is not None:
+                with self._lock:
+                    self._in_progress.discard(key)
+                    self._put_local(key, stored)
+
+        if stored is None:
+            return None
+
+        stored_fingerprint, response = stored
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyMismatch("This Idempotency-Key was already used for a different request.")
+
+        self.replays += 1
+        return response
+
+    def complete(self, key, fingerprint, response) -> None:
+        """Store the response to a request started with `begin`."""
+        with self._lock:
+            self._in_progress.discard(key)
+            self._put_local(key, (fingerprint, response))
+
+        if self.use_table:
+            body, status, headers = response
+            record = IdempotencyRecord(key=key, fingerprint=fingerprint, status=status, body=json.dumps(body),
+                                       headers=json.dumps(headers), expires=timedelta(seconds=self.ttl))
+            try:
+                record.save()
+            except PynamoDBException as e:
+                logger.error(f"Unable to store the response for idempotency key {key}.\n{e}")
+
+    def abandon(self, key) -> None:
+        """Release a key without storing a response, so the request can be retried."""
+        with self._lock:
+            self._in_progress.discard(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+            self._in_progress.clear()
+
+    def _get_local(self, key):
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+
+        expires_at, stored = entry
+        if monotonic() >= expires_at:
+            del self._responses[key]
+            return None
+        return stored
+
+    def _put_local(self, key, stored) -> None:
+        self._responses[key] = (monotonic() + self.ttl, stored)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self.max_items:
+            self._responses.popitem(last=False)
+
+    @staticmethod
+    def _get_remote(key):
+        try:
+            record = IdempotencyRecord.get(key, consistent_read=True)
+        except IdempotencyRecord.DoesNotExist:
+            return None
+        except PynamoDBException as e:
+            logger.error(f"Unable to read the response for idempotency key {key}.\n{e}")
+            return None
+
+        return record.fingerprint, (json.loads(record.body), int(record.status), json.loads(record.headers or '{}'))
+
+
+idempotency_store = IdempotencyStore(ttl=Config.IDEMPOTENCY_TTL,
+                                     max_items=Config.IDEMPOTENCY_MAX_ITEMS,
+                                     use_table=Config.IDEMPOTENCY_USE_TABLE)
+
+
+def _as_response_tuple(response) -> tuple:
+    """Normalize a Resource method's return value to (body, status, headers)."""
+    if not isinstance(response, tuple):
+        return response, 200, {}
+
+    status = response[1] if len(response) > 1 else 200
+    headers = dict(response[2] or {}) if len(response) > 2 else {}
+    return response[0], status, headers
+
+
+def idempotent(method):
+    """
+    Decorator for Resource methods which honors the `Idempotency-Key` header.
+    Responses other than server errors are stored and replayed, with an `Idempotent-Replayed` header.
+    """
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if not idempotency_key:
+            return method(*args, **kwargs)
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return {'message': 'Error', 'data': f'Idempotency-Key is limited to {MAX_KEY_LENGTH} characters.'}, 400
+
+        key = f"{request.method} {request.path} {idempotency_key}"
+        fingerprint = sha256(request.get_data()).hexdigest()
+
+        try:
+            stored = idempotency_store.begin(key, fingerprint)
+        except IdempotencyConflict as e:
+            logger.debug(f"{e} Key: {key}")
+            return {'message': 'Conflict', 'data': str(e)}, 409
+        except IdempotencyMismatch as e:
+            logger.debug(f"{e} Key: {key}")
+            return {'message': 'Error', 'data': str(e)}, 422
+
+        if stored is not None:
+            body, status, headers = stored
+            logger.debug(f"Replaying the stored response for idempotency key {key}.")
+            return body, status, {**headers, 'Idempotent-Replayed': 'true'}
+
+        try:
+            response = method(*args, **kwargs)
+        except BaseException:
+            idempotency_store.abandon(key)
+            raise
+
+        body, status, headers = _as_response_tuple(response)
+        if status >= 500:
+            idempotency_store.abandon(key)
+        else:
+            idempotency_store.complete(key, fingerprint, (body, status, headers))
+        return response
+
+    return wrapper
@@ -0,0 +1,67 @@
+from backend.idempotency import IdempotencyStore, IdempotencyConflict, IdempotencyMismatch, idempotent, \
+    idempotency_store
+from flask import Flask
+import pytest
+
+app = Flask(__name__)
+
+
+class TestIdempotency:
+    def test_store(self):
+        store = IdempotencyStore(ttl=60, max_items=2)
+
+        # The first request is processed, and concurrent retries are rejected until it completes
+        assert store.begin("key-1", "abc") is None
+        with pytest.raises(IdempotencyConflict):
+            store.begin("key-1", "abc")
+
+        store.complete("key-1", "abc", ({"message": "Success"}, 201, {}))
+        assert store.begin("key-1", "abc") == ({"message": "Success"}, 201, {})
+
+        # Keys can't be reused for different requests
+        with pytest.raises(IdempotencyMismatch):
+            store.begin("key-1", "def")
+
+        # Abandoned requests may be retried
+        assert store.begin("key-2", "abc") is None
+        store.abandon("key-2")
+        assert store.begin("key-2", "abc") is None
+
+        # The oldest responses are evicted beyond max_items
+        store.complete("key-2", "abc", ({}, 201, {}))
+        store.begin("key-3", "abc")
+        store.complete("key-3", "abc", ({}, 201, {}))
+        assert store.begin("key-1", "abc") is None
+
+    def test_expiry(self):
+        store = IdempotencyStore(ttl=0)
+        store.begin("key-1", "abc")
+        store.complete("key-1", "abc", ({}, 201, {}))
+        assert store.begin("key-1", "abc") is None
+
+    def test_idempotent(self):
+        calls = []
+
+        @idempotent
+        def post():
+            calls.append(1)
+            return {"message": "Success", "data": len(calls)}, 201
+
+        idempotency_store.clear()
+        with app.test_request_context("/api/v1/cellar", method="POST", data="{}"):
+            assert post() == ({"message": "Success", "data": 1}, 201)
+            assert post() == ({"message": "Success", "data": 2}, 201)
+
+        # Retries with the same key are answered with the stored response
+        with app.test_request_context("/api/v1/cellar", method="POST", data="{}",
+                                      headers={"Idempotency-Key": "retry-me"}):
+            assert post() == ({"message": "Success", "data": 3}, 201)
+            body, status, headers = post()
+            assert (body, status) == ({"message": "Success", "data": 3}, 201)
+            assert headers["Idempotent-Replayed"] == "true"
+
+        with app.test_request_context("/api/v1/cellar", method="POST", data='{"different": true}',
+                                      headers={"Idempotency-Key": "retry-me"}):
+            assert post()[1] == 422
+
+        assert len(calls) == 3
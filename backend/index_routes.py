@@ -0,0 +1,52 @@
+from backend.global_logger import logger
+from backend.cellar_routes import parse_fields
+from backend.filters import parse_filters, read_beverages, CURSOR_KEY_TYPES
+from backend.models import Beverage
+from backend.pagination import encode_cursor, decode_cursor, parse_limit, DEFAULT_LIMIT
+from flask import request
+from flask_restful import Resource
+from pynamodb.exceptions import PynamoDBException
+import json
+
+
+class IndexedBeveragesApi(Resource):
+    """
+    Base for endpoints returning the beverages which share a value of `key_field`, which is the
+    hash key of one of the Beverage indexes.  Subclasses pass the value from their endpoint to `list`.
+    """
+    key_field = None
+
+    def list(self, value) -> json:
+        """
+        Return all beverages with the provided value of `key_field`.
+        Accepts the same `fields`, filter, and pagination parameters as /api/v1/cellar, and always
+        returns one page of up to `limit` (default: DEFAULT_LIMIT) beverages.
+        """
+        logger.debug(f"Request: {request}, for {self.key_field}: {value}.")
+
+        try:
+            fields = parse_fields(request.args.get('fields'))
+            filters = parse_filters(request.args)
+            limit = parse_limit(request.args.get('limit'), default=DEFAULT_LIMIT)
+            start_key = decode_cursor(request.args.get('cursor'), key_types=CURSOR_KEY_TYPES,
+                                      required=Beverage.KEY_FIELDS)
+        except ValueError as e:
+            logger.debug(f"Invalid parameters: {request.args}.\n{e}")
+            return {'message': 'Error', 'data': str(e)}, 400
+
+        # The value from the endpoint takes precedence over any provided as a filter
+        filters[self.key_field] = value
+
+        try:
+            beverages = read_beverages(filters, paginate=True, limit=limit, start_key=start_key,
+                                       fields=fields)
+            output = [bev.to_dict(dates_as_epoch=True, fields=fields) for bev in beverages]
+            next_cursor = encode_cursor(beverages.last_evaluated_key)
+
+            logger.debug(f"End of {type(self).__name__}.GET, returned {len(output)} beverages.")
+            return {'message': 'Success', 'data': output, 'next_cursor': next_cursor}, 200
+
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve beverages for {self.key_field} {value}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
@@ -0,0 +1,14 @@
+from backend.index_routes import IndexedBeveragesApi
+import json
+
+
+class LocationBeveragesApi(IndexedBeveragesApi):
+    """
+    For requesting all beverages at a single location, using the location-producer index.
+    Endpoint: /api/v1/locations/<location>/beverages
+    """
+    key_field = "location"
+
+    def get(self, location) -> json:
+        """Return all beverages at the specified location."""
+        return self.list(location)
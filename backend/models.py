@@ -2,11 +2,70 @@ from backend.global_logger import logger, local
 from backend.config import Config
 from datetime import datetime
 from pynamodb.models import Model
+from pynamodb.constants import ALL_OLD, ATTRIBUTES
+from pynamodb.exceptions import DeleteError
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from pynamodb.attributes import UnicodeAttribute, NumberAttribute, BooleanAttribute, \
-    UTCDateTimeAttribute, ListAttribute, MapAttribute
+    UTCDateTimeAttribute, ListAttribute, MapAttribute, TTLAttribute, VersionAttribute
 
 
-class Beverage(Model):
+class ProducerIndex(GlobalSecondaryIndex):
+    """For querying all beverages from a producer, optionally limited to specific years."""
+    class Meta:
+        index_name = 'producer-year-index'
+        read_capacity_units = 5
+        write_capacity_units = 5
+        projection = AllProjection()
+
+    producer = UnicodeAttribute(hash_key=True)
+    year = NumberAttribute(range_key=True)
+
+
+class LocationIndex(GlobalSecondaryIndex):
+    """For querying all beverages at a location, optionally limited to specific producers."""
+    class Meta:
+        index_name = 'location-producer-index'
+        read_capacity_units = 5
+        write_capacity_units = 5
+        projection = AllProjection()
+
+    location = UnicodeAttribute(hash_key=True)
+    producer = UnicodeAttribute(range_key=True)
+
+
+class VersionedModel(Model):
+    """
+    Base for models with a VersionAttribute, whose version is exposed as an ETag.
+    Writes from instances with a known version are conditioned on it (pynamodb's default), while
+    writes without one are unconditional but still increment the stored version.
+    """
+    def _handle_version_attribute(self, *, attributes=None, actions=None):
+        if self._version_attribute_name is None or getattr(self, self._version_attribute_name) is not None:
+            return super()._handle_version_attribute(attributes=attributes, actions=actions)
+
+        version_attribute = self.get_attributes()[self._version_attribute_name]
+        if attributes is not None:
+            attributes[version_attribute.attr_name] = self._serialize_value(version_attribute, 1)
+        if actions is not None:
+            actions.append(version_attribute.add(1))
+        return None
+
+    def replace(self, condition=None):
+        """
+        Write every attribute of this instance using UpdateItem rather than PutItem, so the stored
+        version is incremented even when the current version isn't known.
+        """
+        actions = []
+        for name, attribute in self.get_attributes().items():
+            if attribute.is_hash_key or attribute.is_range_key or name == self._version_attribute_name:
+                continue
+            value = getattr(self, name)
+            actions.append(attribute.remove() if value is None else attribute.set(value))
+
+        return self.update(actions=actions, condition=condition)
+
+
+class Beverage(VersionedModel):
     class Meta:
         table_name = 'Cellar'
         region = Config.AWS_REGION
@@ -41,42 +100,176 @@ class Beverage(Model):
     date_added = UTCDateTimeAttribute(default=datetime.utcnow())
     last_modified = UTCDateTimeAttribute(default=datetime.utcnow())
 
-    def to_dict(self, dates_as_epoch=True) -> dict:
+    # Incremented by every write, and exposed as the ETag
+    version = VersionAttribute(null=True)
+
+    # Secondary Indexes
+    producer_index = ProducerIndex()
+    location_index = LocationIndex()
+
+    # Attributes returned by to_dict(), in order
+    FIELDS = ("beverage_id", "name", "producer", "year", "batch", "size", "bottle_date", "location",
+              "style", "specific_style", "qty", "qty_cold", "untappd", "aging_potential",
+              "trade_value", "for_trade", "note", "date_added", "last_modified", "version")
+
+    # Always returned, even when specific fields are requested
+    KEY_FIELDS = ("beverage_id", "location")
+
+    def to_dict(self, dates_as_epoch=True, fields=None) -> dict:
         """
-        Return a dictionary with all attributes.
+        Return a dictionary with all attributes, or only those in `fields` (plus the keys).
         Dates return as epoch (default) or in ISO format.
         """
-
-        output = {
-            "beverage_id":         self.beverage_id.__str__(),
-            "name":            self.name.__str__(),
-            "producer":         self.producer.__str__(),
-            "year":            int(self.year),
-            "batch":           int(self.batch) if self.batch else None,
-            "size":            self.size.__str__(),
-            "bottle_date":     self.bottle_date.__str__() if self.bottle_date else None,
-            "location":        self.location.__str__(),
-            "style":           self.style.__str__() if self.style else None,
-            "specific_style":  self.specific_style.__str__() if self.specific_style else None,
-            "qty":             int(self.qty) if self.qty else 0,
-            "qty_cold":        int(self.qty_cold) if self.qty_cold else 0,
-            "untappd":         self.untappd.__str__() if self.untappd else None,
-            "aging_potential": int(self.aging_potential) if self.aging_potential else None,
-            "trade_value":     int(self.trade_value) if self.trade_value else None,
-            "for_trade":       self.for_trade,
-            "note":            self.note.__str__() if self.note else None,
-            "date_added":      self.date_added.timestamp() * 1000,  # JS timestamps are in ms
-            "last_modified":   self.last_modified.timestamp() * 1000
+        serializers = {
+            "beverage_id":     lambda: self.beverage_id.__str__(),
+            "name":            lambda: self.name.__str__(),
+            "producer":        lambda: self.producer.__str__(),
+            "year":            lambda: int(self.year),
+            "batch":           lambda: int(self.batch) if self.batch else None,
+            "size":            lambda: self.size.__str__(),
+            "bottle_date":     lambda: self.bottle_date.__str__() if self.bottle_date else None,
+            "location":        lambda: self.location.__str__(),
+            "style":           lambda: self.style.__str__() if self.style else None,
+            "specific_style":  lambda: self.specific_style.__str__() if self.specific_style else None,
+            "qty":             lambda: int(self.qty) if self.qty else 0,
+            "qty_cold":        lambda: int(self.qty_cold) if self.qty_cold else 0,
+            "untappd":         lambda: self.untappd.__str__() if self.untappd else None,
+            "aging_potential": lambda: int(self.aging_potential) if self.aging_potential else None,
+            "trade_value":     lambda: int(self.trade_value) if self.trade_value else None,
+            "for_trade":       lambda: self.for_trade,
+            "note":            lambda: self.note.__str__() if self.note else None,
+            "date_added":      lambda: self._format_date(self.date_added, dates_as_epoch),
+            "last_modified":   lambda: self._format_date(self.last_modified, dates_as_epoch),
+            "version":         lambda: int(self.version) if self.version else None
         }
 
-        if not dates_as_epoch:
-            output['date_added'] = self.date_added.__str__()
-            output['last_modified'] = self.last_modified.__str__()
+        if fields:
+            fields = [field for field in self.FIELDS if field in fields or field in self.KEY_FIELDS]
+        else:
+            fields = self.FIELDS
 
-        return output
+        return {field: serializers[field]() for field in fields}
+
+    # Attributes which can't be changed by a partial update
+    READ_ONLY_FIELDS = ("beverage_id", "location", "date_added", "last_modified", "version")
+
+    # Attributes which can't be removed
+    REQUIRED_FIELDS = ("producer", "name", "year", "size")
+
+    @classmethod
+    def update_actions(cls, changes) -> list:
+        """
+        Convert a dictionary of changed attributes into a list of update actions.
+        Empty values remove the attribute.  Also sets last_modified to the current time.
+        Raises KeyError for attributes that can't be updated, ValueError for invalid values.
+        """
+        actions = []
+        for field, value in changes.items():
+            if field not in cls.FIELDS:
+                raise KeyError(f"Unknown attribute: {field}.")
+            if field in cls.READ_ONLY_FIELDS:
+                raise KeyError(f"{field} can't be updated.")
+
+            attribute = getattr(cls, field)
+            if value is None or value == "":
+                if field in cls.REQUIRED_FIELDS:
+                    raise ValueError(f"{field} is required.")
+                actions.append(attribute.remove())
+                continue
+
+            if isinstance(attribute, NumberAttribute):
+                try:
+                    value = int(value)
+                except (TypeError, ValueError):
+                    raise ValueError(f"{field} must be an integer, not: {value}.")
+            elif isinstance(attribute, BooleanAttribute):
+                if not isinstance(value, bool):
+                    raise ValueError(f"{field} must be true or false, not: {value}.")
+            else:
+                value = str(value)
+
+            actions.append(attribute.set(value))
+
+        actions.append(cls.last_modified.set(datetime.utcnow()))
+        return actions
+
+    @classmethod
+    def adjustment_condition(cls, qty_delta=0, qty_cold_delta=0, current=None):
+        """
+        Condition ensuring that adding the deltas leaves qty >= 0 and 0 <= qty_cold <= qty.
+        Condition expressions can't do arithmetic, so when qty_cold grows by more than 1 relative
+        to qty, the current (qty, qty_cold) must be provided; the condition then requires that
+        the item is unchanged.  Returns None if the deltas can never be valid for this item.
+        """
+        condition = cls.beverage_id.exists()
+
+        if current is not None:
+            qty, qty_cold = current
+            if qty + qty_delta < 0 or qty_cold + qty_cold_delta < 0 \
+                    or qty_cold + qty_cold_delta > qty + qty_delta:
+                return None
+            condition &= (cls.qty == qty) if qty else cls.qty.does_not_exist() | (cls.qty == 0)
+            condition &= (cls.qty_cold == qty_cold) if qty_cold \
+                else cls.qty_cold.does_not_exist() | (cls.qty_cold == 0)
+            return condition
+
+        # Missing attributes are treated as 0 by ADD
+        if qty_delta < 0:
+            condition &= cls.qty >= -qty_delta
+        if qty_cold_delta < 0:
+            condition &= cls.qty_cold >= -qty_cold_delta
+
+        # Since qty_cold <= qty beforehand, it still holds when qty_cold grows by no more than qty
+        growth = qty_cold_delta - qty_delta
+        if growth == 1:
+            condition &= (cls.qty_cold < cls.qty) | (cls.qty_cold.does_not_exist() & (cls.qty >= 1))
+        elif growth > 1:
+            raise ValueError(f"Current values are required when qty_cold grows by {growth} relative to qty.")
+
+        return condition
+
+    def delete_returning(self, condition=None) -> 'Beverage':
+        """
+        Delete this beverage in a single request, returning the item as it was before deletion.
+        Raises Beverage.DoesNotExist if there was nothing to delete (or `condition` wasn't met).
+        """
+        condition = self.__class__.beverage_id.exists() & condition if condition is not None \
+            else self.__class__.beverage_id.exists()
+        version_condition = self._handle_version_attribute()
+        if version_condition is not None:
+            condition &= version_condition
+
+        hash_key, range_key = self._get_hash_range_key_serialized_values()
+        try:
+            response = self._get_connection().delete_item(hash_key, range_key=range_key, condition=condition,
+                                                          return_values=ALL_OLD)
+        except DeleteError as e:
+            if e.cause_response_code == 'ConditionalCheckFailedException':
+                raise self.DoesNotExist()
+            raise
+
+        return self.from_raw_data(response[ATTRIBUTES])
+
+    @staticmethod
+    def _format_date(value, as_epoch=True):
+        """Dates return as an epoch in ms (JS timestamps are in ms) or as a string."""
+        if value is None:
+            return None
+        if as_epoch:
+            return value.timestamp() * 1000
+        return value.__str__()
 
     def __init__(self, **kwargs):
+        # The version is maintained by the database; conditional writes use the If-Match header
+        if kwargs.get('_user_instantiated', True):
+            kwargs.pop('version', None)
         super().__init__(**kwargs)
+
+        # Items read from the database are populated after __init__, and may only contain
+        #  a subset of attributes when a projection is used.  Skip validation for these.
+        if not kwargs.get('_user_instantiated', True):
+            return
+
         # logger.debug(f"Initializing a new instance of the Beverage model for {kwargs}.")
         # Replace empty strings with None
         # Construct the concatenated beverage_id when not provided:
@@ -186,6 +379,85 @@ class Beverage(Model):
                f' location: {self.location}>'
 
 
+class BeverageChange(Model):
+    """
+    Change log for the Cellar table, used to answer delta syncs.
+    Entries are partitioned by UTC date so all changes after a point in time can be Queried.
+    """
+    class Meta:
+        table_name = 'CellarChanges'
+        region = Config.AWS_REGION
+        if local:  # Use the local DynamoDB instance when running locally
+            host = 'http://localhost:8008'
+
+    # Primary Attributes
+    # `day`: UTC date of the change, YYYY-MM-DD
+    day = UnicodeAttribute(hash_key=True)
+    # `change_id`: Zero-padded epoch (ms) of the change, beverage_id, and location
+    change_id = UnicodeAttribute(range_key=True)
+
+    beverage_id = UnicodeAttribute()
+    location = UnicodeAttribute()
+    changed_at = NumberAttribute()  # Epoch, in ms
+    deleted = BooleanAttribute(default=False)
+
+    # JSON from Beverage.to_dict(), not stored for deletions
+    data = UnicodeAttribute(null=True)
+
+    # DynamoDB automatically removes entries after this time
+    expires = TTLAttribute(null=True)
+
+    def __repr__(self) -> str:
+        return f'<BeverageChange | beverage_id: {self.beverage_id}, location: {self.location}, ' \
+               f'changed_at: {self.changed_at}, deleted: {self.deleted}>'
+
+
+class CellarVersion(Model):
+    """
+    Single entry in the change log's table, bumped by every write to the Cellar table, so clients
+    can tell whether the collection changed without scanning it.
+    """
+    class Meta:
+        table_name = 'CellarChanges'
+        region = Config.AWS_REGION
+        if local:  # Use the local DynamoDB instance when running locally
+            host = 'http://localhost:8008'
+
+    # Keys share the change log's schema, outside of its date partitions
+    day = UnicodeAttribute(hash_key=True)
+    change_id = UnicodeAttribute(range_key=True)
+
+    version = NumberAttribute(default=0)  # Number of writes
+    last_modified = NumberAttribute(null=True)  # Epoch, in ms, of the latest write
+
+    def __repr__(self) -> str:
+        return f'<CellarVersion | version: {self.version}, last_modified: {self.last_modified}>'
+
+
+class IdempotencyRecord(Model):
+    """Completed responses to requests which provided an Idempotency-Key header."""
+    class Meta:
+        table_name = 'CellarIdempotency'
+        region = Config.AWS_REGION
+        if local:  # Use the local DynamoDB instance when running locally
+            host = 'http://localhost:8008'
+
+    # `key`: Method, path, and the Idempotency-Key provided with the request
+    key = UnicodeAttribute(hash_key=True)
+    # `fingerprint`: Hash of the request body, so a key can't be reused for a different request
+    fingerprint = UnicodeAttribute()
+
+    status = NumberAttribute()
+    body = UnicodeAttribute()  # JSON
+    headers = UnicodeAttribute(null=True)  # JSON
+
+    # DynamoDB automatically removes entries after this time
+    expires = TTLAttribute(null=True)
+
+    def __repr__(self) -> str:
+        return f'<IdempotencyRecord | key: {self.key}, status: {self.status}>'
+
+
 class PicklistValue(MapAttribute):
     """Individual value within each Picklist.values list"""
     # Primary attributes
@@ -211,7 +483,7 @@ class PicklistValue(MapAttribute):
         return output
 
 
-class Picklist(Model):
+class Picklist(VersionedModel):
     class Meta:
         table_name = 'CellarPicklists'
         region = Config.AWS_REGION
@@ -223,6 +495,9 @@ class Picklist(Model):
     list_values = ListAttribute(of=PicklistValue)
     last_modified = UnicodeAttribute(default=datetime.utcnow())
 
+    # Incremented by every write, and exposed as the ETag
+    version = VersionAttribute(null=True)
+
     def to_dict(self) -> dict:
         """Convert this Picklist (and any children) to a python dictionary."""
 
@@ -240,15 +515,25 @@ class Picklist(Model):
         output = {
             "list_name":     self.list_name.__str__(),
             "list_values":   value_list,
-            "last_modified": self.last_modified.timestamp() * 1000  # JS timestamps are in ms
+            "last_modified": self._last_modified_datetime().timestamp() * 1000,  # JS timestamps are in ms
+            "version":       int(self.version) if self.version else None
         }
 
         return output
 
+    def _last_modified_datetime(self) -> datetime:
+        """last_modified is stored as an ISO-formatted string, and is a datetime when set locally."""
+        if isinstance(self.last_modified, datetime):
+            return self.last_modified
+        return datetime.fromisoformat(str(self.last_modified))
+
     def __repr__(self) -> str:
         return f'<Picklist values for {self.list_name}>'
 
     def __init__(self, **kwargs):
+        # The version is maintained by the database; conditional writes use the If-Match header
+        if kwargs.get('_user_instantiated', True):
+            kwargs.pop('version', None)
         super().__init__(**kwargs)
 
         # Type check: last_modified
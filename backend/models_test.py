@@ -1,5 +1,8 @@
 from backend.models import Beverage
 from datetime import datetime
+from pynamodb.connection.table import TableConnection
+from pynamodb.exceptions import DeleteError
+from botocore.exceptions import ClientError
 import pytest
 
 
@@ -436,6 +439,123 @@ class TestBeverageModel:
         assert abs(now - beverage_dict['date_added']) < 1
         assert abs(now - beverage_dict['last_modified']) < 1
 
+    def test_to_dict_fields(self):
+        beverage = Beverage(**default_beverage)
+
+        # Only the requested fields are returned, plus the keys
+        beverage_dict = beverage.to_dict(fields=["producer", "qty"])
+        assert beverage_dict == {"beverage_id": "This Is My #4 BeverageId",
+                                 "producer":    "Westbrook",
+                                 "location":    "Home",
+                                 "qty":         14}
+
+        # No fields means all fields
+        assert list(beverage.to_dict(fields=None).keys()) == list(Beverage.FIELDS)
+
+    def test_from_database(self):
+        # Items read from the database skip validation, since projections may omit required attributes
+        raw = {"beverage_id": {"S": "This Is My #5 BeverageId"},
+               "location":    {"S": "Home"},
+               "qty":         {"N": "3"}}
+        beverage = Beverage.from_raw_data(raw)
+
+        assert beverage.beverage_id == "This Is My #5 BeverageId"
+        assert beverage.to_dict(fields=["qty"]) == {"beverage_id": "This Is My #5 BeverageId",
+                                                    "location":    "Home",
+                                                    "qty":         3}
+
+    def test_update_actions(self):
+        actions = Beverage.update_actions({"qty": "3", "note": "", "for_trade": False})
+        serialized = [str(action) for action in actions]
+
+        # Values are converted to the attribute's type, empty values are removed
+        assert "qty = {'N': '3'}" in serialized
+        assert "note" in serialized
+        assert "for_trade = {'BOOL': False}" in serialized
+
+        # last_modified is always updated
+        assert len(actions) == 4
+        assert serialized[-1].startswith("last_modified = ")
+
+        with pytest.raises(KeyError):
+            Beverage.update_actions({"location": "Fridge"})
+
+        with pytest.raises(KeyError):
+            Beverage.update_actions({"Mr. Peanutbutter": 1})
+
+        with pytest.raises(ValueError):
+            Beverage.update_actions({"qty": "Five"})
+
+        with pytest.raises(ValueError):
+            Beverage.update_actions({"producer": None})
+
+    def test_adjustment_condition(self):
+        # Drinking a cold bottle only needs stock of each
+        condition = str(Beverage.adjustment_condition(-1, -1))
+        assert "qty >= {'N': '1'}" in condition
+        assert "qty_cold >= {'N': '1'}" in condition
+
+        # Chilling a bottle requires a warm one
+        condition = str(Beverage.adjustment_condition(0, 1))
+        assert "qty_cold < qty" in condition
+
+        # Larger increases to qty_cold need the current values
+        with pytest.raises(ValueError):
+            Beverage.adjustment_condition(0, 2)
+
+        assert "qty = {'N': '3'}" in str(Beverage.adjustment_condition(0, 2, current=(3, 1)))
+        assert Beverage.adjustment_condition(0, 2, current=(3, 2)) is None
+        assert Beverage.adjustment_condition(-4, 0, current=(3, 0)) is None
+
+    def test_delete_returning(self, monkeypatch):
+        requests = []
+
+        def fake_delete_item(self, hash_key, range_key=None, condition=None, return_values=None, **kwargs):
+            requests.append((condition, return_values))
+            if hash_key != default_beverage["beverage_id"]:
+                error = ClientError({"Error": {"Code": "ConditionalCheckFailedException"}}, "DeleteItem")
+                raise DeleteError("Failed to delete item", cause=error)
+            return {"Attributes": Beverage(**default_beverage).serialize()}
+
+        monkeypatch.setattr(TableConnection, "delete_item", fake_delete_item)
+
+        # A single conditional request returns the deleted item
+        beverage = Beverage(beverage_id=default_beverage["beverage_id"], location="Home", _user_instantiated=False)
+        deleted = beverage.delete_returning()
+        assert deleted.producer == "Westbrook"
+        assert "attribute_exists (beverage_id)" in str(requests[0][0])
+        assert requests[0][1] == "ALL_OLD"
+
+        with pytest.raises(Beverage.DoesNotExist):
+            Beverage(beverage_id="Nope", location="Home", _user_instantiated=False).delete_returning()
+
+    def test_versioning(self, monkeypatch):
+        requests = []
+
+        def fake_update_item(self, hash_key, range_key=None, actions=None, condition=None, **kwargs):
+            requests.append((actions, condition))
+            return {"Attributes": Beverage(**default_beverage).serialize()}
+
+        monkeypatch.setattr(TableConnection, "update_item", fake_update_item)
+
+        # Versions in the provided data are ignored
+        beverage = Beverage(**default_beverage, version=7)
+        assert beverage.version is None
+
+        # Without a known version, every attribute is written unconditionally and the version incremented
+        beverage.replace()
+        actions, condition = requests[-1]
+        assert condition is None
+        assert "version {'N': '1'}" in [str(action) for action in actions]
+        assert "producer = {'S': 'Westbrook'}" in [str(action) for action in actions]
+
+        # Items read from the database are conditioned on their version
+        raw = Beverage(**default_beverage).serialize()
+        raw["version"] = {"N": "4"}
+        Beverage.from_raw_data(raw).update(actions=[Beverage.qty.add(1)])
+        actions, condition = requests[-1]
+        assert str(condition) == "version = {'N': '4'}"
+
     # def test_to_json(self):
     #     # Verify the output is json by calling json.loads() without raising an exception
     #     beverage_json = Beverage(**default_beverage).to_json()
@@ -0,0 +1,88 @@
+"""
+Moving bottles of a beverage between locations.
+Both items are read in one TransactGet, then the source & destination are written in one
+TransactWrite, conditioned on neither having changed in between, so a move is never half-applied.
+"""
+from backend.global_logger import logger
+from backend.models import Beverage
+from pynamodb.transactions import TransactGet, TransactWrite
+from datetime import datetime
+
+
+class MoveConflict(Exception):
+    """Raised when the source can't supply the bottles requested, or an item changed mid-move."""
+
+
+def _connection():
+    """The pynamodb connection used by the Beverage table, as transactions require one."""
+    return Beverage._get_connection().connection
+
+
+def move_beverage(beverage_id, source, destination, qty, qty_cold=0) -> tuple:
+    """
+    Move `qty` bottles (`qty_cold` of which are cold) of a beverage from one location to another.
+    The destination is created from the source when it doesn't exist, and the source is deleted
+    when no bottles remain.
+    Returns a tuple: (source after the move or None if deleted, destination after the move).
+    Raises Beverage.DoesNotExist if the source doesn't exist, or MoveConflict.
+    """
+    with TransactGet(connection=_connection()) as transaction:
+        source_future = transaction.get(Beverage, beverage_id, source)
+        destination_future = transaction.get(Beverage, beverage_id, destination)
+
+    source_item = source_future.get()
+    try:
+        destination_item = destination_future.get()
+    except Beverage.DoesNotExist:
+        destination_item = None
+
+    # Conditions on the values just read also enforce qty >= 0 and qty_cold <= qty
+    current = (source_item.qty or 0, source_item.qty_cold or 0)
+    source_condition = Beverage.adjustment_condition(-qty, -qty_cold, current=current)
+    if source_condition is None:
+        raise MoveConflict(f"{source} has {current[0]} bottles ({current[1]} cold) of {beverage_id}, "
+                           f"which can't supply {qty} ({qty_cold} cold).")
+
+    if destination_item is not None:
+        existing = (destination_item.qty or 0, destination_item.qty_cold or 0)
+        destination_condition = Beverage.adjustment_condition(qty, qty_cold, current=existing)
+        if destination_condition is None:
+            raise MoveConflict(f"{destination} has {existing[0]} bottles ({existing[1]} cold) of "
+                               f"{beverage_id}, which can't accept {qty} ({qty_cold} cold).")
+    else:
+        # New destinations are copied from the source, aside from its version
+        copy = source_item.serialize()
+        copy.pop(Beverage.version.attr_name, None)
+        destination_item = Beverage.from_raw_data(copy)
+        destination_item.location = destination
+        existing = destination_condition = None
+
+    now = datetime.utcnow()
+    with TransactWrite(connection=_connection()) as transaction:
+        if current[0] == qty:
+            transaction.delete(source_item, condition=source_condition)
+            source_item = None
+        else:
+            transaction.update(source_item, condition=source_condition,
+                               actions=[Beverage.qty.add(-qty), Beverage.qty_cold.add(-qty_cold),
+                                        Beverage.last_modified.set(now)])
+            source_item.qty = current[0] - qty
+            source_item.qty_cold = current[1] - qty_cold
+            source_item.last_modified = now
+
+        if existing is None:
+            destination_item.qty = qty
+            destination_item.qty_cold = qty_cold
+            destination_item.date_added = now
+            destination_item.last_modified = now
+            transaction.save(destination_item, condition=Beverage.beverage_id.does_not_exist())
+        else:
+            transaction.update(destination_item, condition=destination_condition,
+                               actions=[Beverage.qty.add(qty), Beverage.qty_cold.add(qty_cold),
+                                        Beverage.last_modified.set(now)])
+            destination_item.qty = existing[0] + qty
+            destination_item.qty_cold = existing[1] + qty_cold
+            destination_item.last_modified = now
+
+    logger.debug(f"Moved {qty} bottles ({qty_cold} cold) of {beverage_id} from {source} to {destination}.")
+    return source_item, destination_item
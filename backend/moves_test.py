@@ -0,0 +1,73 @@
+from backend.moves import move_beverage, MoveConflict
+from backend.models import Beverage
+from pynamodb.connection import Connection
+from pynamodb.connection.base import MetaTable
+import pytest
+
+
+class TestMoves:
+    @pytest.fixture
+    def transactions(self, monkeypatch):
+        """Fake transactions against the provided stored items; returns the written requests."""
+        stored = {}
+        writes = []
+
+        def fake_transact_get_items(self, get_items, **kwargs):
+            return {"Responses": [{"Item": stored[item['Key']['location']['S']]}
+                                  if item['Key']['location']['S'] in stored else {}
+                                  for item in get_items]}
+
+        def fake_transact_write_items(self, **kwargs):
+            writes.append(kwargs)
+            return {}
+
+        # Transactions describe the table to find its keys
+        meta_table = MetaTable({
+            "TableName": "Cellar",
+            "KeySchema": [{"AttributeName": "beverage_id", "KeyType": "HASH"},
+                          {"AttributeName": "location", "KeyType": "RANGE"}],
+            "AttributeDefinitions": [{"AttributeName": "beverage_id", "AttributeType": "S"},
+                                     {"AttributeName": "location", "AttributeType": "S"}]
+        })
+        monkeypatch.setattr(Connection, "get_meta_table", lambda self, table_name: meta_table)
+        monkeypatch.setattr(Connection, "transact_get_items", fake_transact_get_items)
+        monkeypatch.setattr(Connection, "transact_write_items", fake_transact_write_items)
+        return stored, writes
+
+    def test_move_to_new_location(self, transactions, stored_beverage):
+        stored, writes = transactions
+        stored["Cellar"] = stored_beverage(location="Cellar", qty=3)
+
+        source, destination = move_beverage("Westbrook Gose 2013", "Cellar", "Fridge", 1)
+        assert (source.qty, destination.qty, destination.location) == (2, 1, "Fridge")
+
+        # The source is decremented and the destination created in a single transaction
+        assert len(writes) == 1
+        assert len(writes[0]['update_items']) == 1
+        assert writes[0]['put_items'][0]['Item']['location'] == {'S': 'Fridge'}
+
+    def test_move_all_bottles(self, transactions, stored_beverage):
+        stored, writes = transactions
+        stored["Cellar"] = stored_beverage(location="Cellar", qty=2, qty_cold=1)
+        stored["Fridge"] = stored_beverage(location="Fridge", qty=1, qty_cold=1)
+
+        source, destination = move_beverage("Westbrook Gose 2013", "Cellar", "Fridge", 2, qty_cold=1)
+        assert source is None
+        assert (destination.qty, destination.qty_cold) == (3, 2)
+
+        # The emptied source is deleted, and the existing destination incremented
+        assert len(writes[0]['delete_items']) == 1
+        assert len(writes[0]['update_items']) == 1
+        assert writes[0]['put_items'] == []
+
+    def test_move_conflicts(self, transactions, stored_beverage):
+        stored, writes = transactions
+        stored["Cellar"] = stored_beverage(location="Cellar", qty=1)
+
+        with pytest.raises(MoveConflict):
+            move_beverage("Westbrook Gose 2013", "Cellar", "Fridge", 2)
+
+        with pytest.raises(Beverage.DoesNotExist):
+            move_beverage("Westbrook Gose 2013", "Basement", "Fridge", 1)
+
+        assert writes == []
@@ -0,0 +1,87 @@
+"""Helpers for cursor-based pagination over DynamoDB scans & queries."""
+from backend.global_logger import logger
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as Base64Error
+import json
+
+# Page size when paginating without a `limit`, and the upper bound on `limit`
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+def encode_cursor(last_evaluated_key) -> str:
+    """
+    Convert a DynamoDB `LastEvaluatedKey` into an opaque, url-safe cursor string.
+    Returns None when there are no more pages to read.
+    """
+    if not last_evaluated_key:
+        return None
+
+    raw = json.dumps(last_evaluated_key, separators=(',', ':'), sort_keys=True)
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor, key_types=None, required=()) -> dict:
+    """
+    Convert a cursor string (from `encode_cursor`) back into a DynamoDB `ExclusiveStartKey`.
+    When `key_types` ({attribute name: DynamoDB type}) is provided, the key may only contain those
+    attributes, in DynamoDB's typed form, and must contain each of the `required` attributes.
+    Raises ValueError when the cursor can't be decoded or isn't a valid key.
+    """
+    if not cursor:
+        return None
+
+    try:
+        decoded = json.loads(urlsafe_b64decode(cursor.encode()).decode())
+    except (Base64Error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        logger.debug(f"Unable to decode cursor: {cursor}.\n{e}")
+        raise ValueError(f"Invalid cursor: {cursor}.")
+
+    if not isinstance(decoded, dict):
+        logger.debug(f"Decoded cursor is not a dictionary: {decoded}.")
+        raise ValueError(f"Invalid cursor: {cursor}.")
+
+    if key_types is not None and not _is_valid_key(decoded, key_types, required):
+        logger.debug(f"Decoded cursor is not a valid key: {decoded}.")
+        raise ValueError(f"Invalid cursor: {cursor}.")
+
+    return decoded
+
+
+def _is_valid_key(key, key_types, required) -> bool:
+    """Whether a decoded cursor only contains the provided key attributes, each as {type: value}."""
+    if not key or any(name not in key for name in required):
+        return False
+
+    for name, typed_value in key.items():
+        if name not in key_types or not isinstance(typed_value, dict) or len(typed_value) != 1:
+            return False
+
+        attr_type, value = next(iter(typed_value.items()))
+        if attr_type != key_types[name] or not isinstance(value, str):
+            return False
+        if attr_type == 'N':
+            try:
+                float(value)
+            except ValueError:
+                return False
+
+    return True
+
+
+def parse_limit(value, default=None) -> int:
+    """Validate the `limit` query parameter.  Returns `default` when not provided."""
+    if value is None or value == "":
+        return default
+
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Limit must be an integer, not: {value}.")
+
+    if limit < 1:
+        raise ValueError(f"Limit must be a positive integer, not: {limit}.")
+    if limit > MAX_LIMIT:
+        raise ValueError(f"Limit must be at most {MAX_LIMIT}, not: {limit}.")
+
+    return limit
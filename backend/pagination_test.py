@@ -0,0 +1,64 @@
+from backend.pagination import encode_cursor, decode_cursor, parse_limit, DEFAULT_LIMIT, MAX_LIMIT
+import pytest
+
+
+class TestCursors:
+    def test_round_trip(self):
+        last_key = {"beverage_id": {"S": "Westbrook_Gose_2013_12 oz_None"},
+                    "location":    {"S": "Home"}}
+        cursor = encode_cursor(last_key)
+
+        assert isinstance(cursor, str)
+        assert decode_cursor(cursor) == last_key
+
+    def test_empty(self):
+        # No LastEvaluatedKey means there are no more pages
+        assert encode_cursor(None) is None
+        assert encode_cursor({}) is None
+        assert decode_cursor(None) is None
+        assert decode_cursor("") is None
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("Mr. Peanutbutter")
+
+        # Valid base64 & JSON, but not a key
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor([1, 2, 3]))
+
+    def test_key_validation(self):
+        key_types = {"beverage_id": "S", "location": "S", "year": "N"}
+        required = ("beverage_id", "location")
+        valid = {"beverage_id": {"S": "Westbrook_Gose"}, "location": {"S": "Home"}, "year": {"N": "2013"}}
+        assert decode_cursor(encode_cursor(valid), key_types=key_types, required=required) == valid
+
+        invalid = [
+            {"beverage_id": {"S": "Westbrook_Gose"}},        # Missing a key
+            {**valid, "qty": {"N": "1"}},                    # Not a key
+            {**valid, "location": "Home"},                   # Not typed
+            {**valid, "location": {"N": "1"}},               # Wrong type
+            {**valid, "location": {"S": "Home", "N": "1"}},  # Two types
+            {**valid, "year": {"N": "Twenty-thirteen"}},     # Not a number
+            {**valid, "year": {"N": 2013}}                   # Not serialized
+        ]
+        for key in invalid:
+            with pytest.raises(ValueError):
+                decode_cursor(encode_cursor(key), key_types=key_types, required=required)
+
+
+class TestParseLimit:
+    def test_parse_limit(self):
+        assert parse_limit(None) is None
+        assert parse_limit("") is None
+        assert parse_limit("25") == 25
+        assert parse_limit("", default=DEFAULT_LIMIT) == DEFAULT_LIMIT
+
+        with pytest.raises(ValueError):
+            parse_limit("Five")
+
+        with pytest.raises(ValueError):
+            parse_limit("0")
+
+        assert parse_limit(str(MAX_LIMIT)) == MAX_LIMIT
+        with pytest.raises(ValueError):
+            parse_limit(str(MAX_LIMIT + 1))
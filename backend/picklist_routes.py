@@ -1,47 +1,122 @@
 from backend.global_logger import logger
+from backend.config import Config
+from backend.cache import picklist_cache
 from backend.models import Picklist
+from backend.preconditions import etag, if_match_condition, not_modified, PreconditionFailed
+from backend.scanning import scan_model
+from backend.singleflight import picklist_reads
 from flask import request
 from flask_restful import Resource
-from pynamodb.exceptions import PynamoDBException
+from pynamodb.exceptions import PynamoDBException, UpdateError
 from datetime import datetime
 import json
 
 
+def cache_headers(picklists_etag) -> dict:
+    """Headers letting browsers reuse picklists, revalidating with the ETag once they expire."""
+    return {'ETag': picklists_etag,
+            'Cache-Control': f'public, max-age={Config.PICKLIST_MAX_AGE}, '
+                             f'stale-while-revalidate={Config.PICKLIST_MAX_AGE}'}
+
+
 class PicklistApi(Resource):
     """
     Handles the pre-defined values for picklist fields:
       `location`, `size`, `style`
     Endpoint: /api/v1/picklist-data
     """
+    # Limit on the number of picklists requested by name
+    MAX_NAMES = 100
+
     def get(self) -> json:
-        """Return the list of picklist values for all fields."""
+        """
+        Return the list of picklist values for all fields, or only those listed in `names`.
+        Served from the picklist cache, with an ETag so unchanged picklists return 304.
+        """
         logger.debug(f"Request: {request}")
 
+        if request.args.get('names') is not None:
+            return self.get_named(request.args.get('names'))
+
         try:
-            # Read from the database
-            logger.debug("Retrieving all picklist values...")
-            all_picklists = Picklist.scan()
-
-            # Convert each record to a dictionary, compile into a list
-            output = []
-            for picklist in all_picklists:
-                output.append(picklist.to_dict())
-                # picklist.save()
-                # output = picklist.to_dict()
-                # pass
+            output, picklists_etag = picklist_cache.get(self.load)
+            headers = cache_headers(picklists_etag)
+
+            if not_modified(picklists_etag):
+                logger.debug(f"End of PicklistApi.GET, not modified.")
+                return None, 304, headers
 
             logger.debug(f"End of PicklistApi.GET")
-            return {'message': 'Success', 'data': output}, 200
+            return {'message': 'Success', 'data': output}, 200, headers
 
         except PynamoDBException as e:
             error_msg = f"Error attempting to retrieve picklists from the database."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
 
+    def get_named(self, names) -> json:
+        """
+        Return the picklists listed in `names` (comma-separated), plus any names which weren't found.
+        Uses the cached picklists when fresh, otherwise a BatchGetItem for only those picklists.
+        """
+        names = list(dict.fromkeys(name.strip() for name in names.split(',') if name.strip()))
+        if not names:
+            return {'message': 'Error', 'data': 'At least one picklist name must be provided.'}, 400
+        if len(names) > self.MAX_NAMES:
+            error_msg = f"Too many picklists requested: {len(names)}, limit is {self.MAX_NAMES}."
+            return {'message': 'Error', 'data': error_msg}, 400
+
+        try:
+            cached = picklist_cache.peek()
+            if cached is not None:
+                output = [picklist for picklist in cached if picklist['list_name'] in names]
+            else:
+                output = [picklist.to_dict() for picklist in Picklist.batch_get(names)]
+
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve picklists {', '.join(names)} from the database."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        # Return the picklists in the order requested
+        order = {name: position for position, name in enumerate(names)}
+        output.sort(key=lambda picklist: order[picklist['list_name']])
+        found = {picklist['list_name'] for picklist in output}
+        not_found = [name for name in names if name not in found]
+
+        headers = cache_headers(picklist_cache.etag_for(output))
+        if not not_found and not_modified(headers['ETag']):
+            logger.debug(f"End of PicklistApi.GET, not modified.")
+            return None, 304, headers
+
+        logger.debug(f"End of PicklistApi.GET, returned {len(output)} picklists.")
+        return {'message': 'Success', 'data': output, 'not_found': not_found}, 200, headers
+
+    @classmethod
+    def load(cls) -> list:
+        """Read every picklist for the cache; concurrent loads share a single scan."""
+        return picklist_reads.do('all', cls.read_all)
+
+    @staticmethod
+    def read_all() -> list:
+        """Read every picklist from the database, converted to dictionaries."""
+        logger.debug("Retrieving all picklist values...")
+        all_picklists = scan_model(Picklist, total_segments=Config.PICKLIST_SCAN_SEGMENTS)
+        return [picklist.to_dict() for picklist in all_picklists]
+
     def put(self) -> json:
-        """Add/update the list of picklist values."""
+        """
+        Add/update the list of picklist values.
+        When an If-Match header is provided, the update only applies if the picklist's ETag matches.
+        """
         logger.debug(f"Request: {request}")
 
+        try:
+            condition = if_match_condition(Picklist)
+        except PreconditionFailed as e:
+            logger.debug(str(e))
+            return {'message': 'Precondition Failed', 'data': str(e)}, 412
+
         # Ensure there's a body to accompany this request
         if not request.data:
             return {'message': 'Error', 'data': 'PUT request must contain a body.'}, 400
@@ -63,7 +138,7 @@ class PicklistApi(Resource):
         # Create a Picklist instance from the provided data
         try:
             picklist = Picklist(**data)
-            picklist.last_modified = datetime.utcnow()
+            picklist.last_modified = datetime.utcnow().isoformat()
             logger.debug(f"Picklist instance created: {picklist}")
 
         except PynamoDBException as e:
@@ -74,14 +149,55 @@ class PicklistApi(Resource):
         # Save to the database
         try:
             logger.debug(f"Saving {picklist} to the db...")
-            picklist.save()
+            picklist.replace(condition=condition)
+            picklist_cache.invalidate()
             logger.info(f"Picklist updated: {picklist.list_name})")
             logger.debug(f"End of PicklistApi.PUT")
-            return {'message': 'Success', 'data': picklist.to_dict()}, 200
-        except Picklist.DoesNotExist:
-            logger.debug(f"Picklist {picklist} not found.")
-            return {'message': 'Not Found', 'data': f'Picklist {picklist} not found.'}, 404
+            return {'message': 'Success', 'data': picklist.to_dict()}, 200, {'ETag': etag(picklist.version)}
+        except UpdateError as e:
+            if e.cause_response_code == 'ConditionalCheckFailedException':
+                error_msg = f"Picklist {picklist.list_name} has been modified since it was retrieved."
+                logger.debug(error_msg)
+                return {'message': 'Precondition Failed', 'data': error_msg}, 412
+            error_msg = f"Error attempting to save picklist {picklist}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
         except PynamoDBException as e:
             error_msg = f"Error attempting to save picklist {picklist}."
             logger.debug(f"{error_msg}\n{e}")
             return {'message': 'Error', 'data': error_msg}, 500
+
+
+class PicklistItemApi(Resource):
+    """
+    For requesting a single picklist.
+    Endpoint: /api/v1/picklist-data/<list_name>
+    """
+    def get(self, list_name) -> json:
+        """Return the specified picklist, with its version as the ETag."""
+        logger.debug(f"Request: {request}, for list: {list_name}.")
+
+        try:
+            cached = picklist_cache.peek()
+            if cached is not None:
+                output = next((picklist for picklist in cached if picklist['list_name'] == list_name), None)
+                if output is None:
+                    raise Picklist.DoesNotExist()
+            else:
+                output = Picklist.get(list_name).to_dict()
+
+        except Picklist.DoesNotExist:
+            logger.debug(f"Picklist {list_name} not found.")
+            return {'message': 'Not Found', 'data': f'Picklist {list_name} not found.'}, 404
+        except PynamoDBException as e:
+            error_msg = f"Error attempting to retrieve picklist {list_name}."
+            logger.debug(f"{error_msg}\n{e}")
+            return {'message': 'Error', 'data': error_msg}, 500
+
+        headers = cache_headers(etag(output['version']))
+        if not_modified(headers['ETag']):
+            logger.debug(f"End of PicklistItemApi.GET, not modified.")
+            return None, 304, headers
+
+        logger.debug(f"End of PicklistItemApi.GET")
+        return {'message': 'Success', 'data': output}, 200, headers
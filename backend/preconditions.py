@@ -0,0 +1,47 @@
+"""
+ETags & conditional request headers: If-Match for writes, based on each item's version attribute,
+and If-None-Match for reads.
+"""
+from flask import request
+from werkzeug.http import unquote_etag
+
+
+class PreconditionFailed(Exception):
+    """Raised when an If-Match header can't match any version."""
+
+
+def etag(version) -> str:
+    """Strong ETag for a version; items written before versioning was added are version 0."""
+    return f'"{int(version or 0)}"'
+
+
+def if_match_condition(model):
+    """
+    Condition requiring the stored version of a model's item to match the request's If-Match header.
+    Returns None when no header was provided, or only requires that the item exists for `*`.
+    Raises PreconditionFailed when no strong, numeric ETag was provided.
+    """
+    if_match = request.if_match
+    if not if_match:
+        return None
+    if if_match.star_tag:
+        return model._hash_key_attribute().exists()
+
+    try:
+        versions = sorted({int(tag) for tag in if_match.as_set()})
+    except ValueError:
+        raise PreconditionFailed(f"If-Match must contain ETags returned by this API: {if_match}.")
+    if not versions:
+        raise PreconditionFailed(f"If-Match requires strong ETags: {if_match}.")
+
+    version_attribute = getattr(model, model._version_attribute_name)
+    condition = version_attribute.is_in(*versions)
+    if 0 in versions:
+        condition |= version_attribute.does_not_exist()
+    return model._hash_key_attribute().exists() & condition
+
+
+def not_modified(current_etag) -> bool:
+    """Whether the request's If-None-Match header matches the current ETag, so a 304 can be returned."""
+    tag, _ = unquote_etag(current_etag)
+    return request.if_none_match.contains_weak(tag)
@@ -0,0 +1,48 @@
+from backend.preconditions import etag, if_match_condition, not_modified, PreconditionFailed
+from backend.models import Beverage
+from flask import Flask
+import pytest
+
+app = Flask(__name__)
+
+
+class TestPreconditions:
+    def test_etag(self):
+        assert etag(3) == '"3"'
+        assert etag(None) == '"0"'
+
+    def test_if_match_condition(self):
+        with app.test_request_context():
+            assert if_match_condition(Beverage) is None
+
+        with app.test_request_context(headers={"If-Match": '"3", "4"'}):
+            condition = str(if_match_condition(Beverage))
+            assert "attribute_exists (beverage_id)" in condition
+            assert "version IN ({'N': '3'}, {'N': '4'})" in condition
+
+        # Items written before versioning match ETag "0"
+        with app.test_request_context(headers={"If-Match": '"0"'}):
+            assert "attribute_not_exists (version)" in str(if_match_condition(Beverage))
+
+        with app.test_request_context(headers={"If-Match": "*"}):
+            assert str(if_match_condition(Beverage)) == "attribute_exists (beverage_id)"
+
+        # Weak or foreign ETags can never match
+        with app.test_request_context(headers={"If-Match": 'W/"3"'}):
+            with pytest.raises(PreconditionFailed):
+                if_match_condition(Beverage)
+
+        with app.test_request_context(headers={"If-Match": '"abc"'}):
+            with pytest.raises(PreconditionFailed):
+                if_match_condition(Beverage)
+
+    def test_not_modified(self):
+        with app.test_request_context():
+            assert not not_modified('"3"')
+
+        with app.test_request_context(headers={"If-None-Match": '"2", W/"3"'}):
+            assert not_modified('"3"')
+            assert not not_modified('"4"')
+
+        with app.test_request_context(headers={"If-None-Match": "*"}):
+            assert not_modified('"4"')
@@ -0,0 +1,14 @@
+from backend.index_routes import IndexedBeveragesApi
+import json
+
+
+class ProducerBeveragesApi(IndexedBeveragesApi):
+    """
+    For requesting all beverages from a single producer, using the producer-year index.
+    Endpoint: /api/v1/producers/<producer>/beverages
+    """
+    key_field = "producer"
+
+    def get(self, producer) -> json:
+        """Return all beverages from the specified producer."""
+        return self.list(producer)
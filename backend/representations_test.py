@@ -0,0 +1,44 @@
+from backend import representations
+from backend.representations import output_json
+from flask import Flask
+import json
+import pytest
+
+
+@pytest.fixture
+def app():
+    return Flask("representations_test")
+
+
+PAYLOAD = {'message': 'Success', 'data': [{'beverage_id': '1', 'name': 'Gose, "Aged"', 'qty': 2,
+                                           'for_trade': True, 'note': None, 'producer': 'Tilquin à l\'Ancienne'}]}
+
+
+class TestOutputJson:
+    def test_output_json(self, app):
+        with app.app_context():
+            resp = output_json(PAYLOAD, 201, headers={'ETag': '"1"'})
+
+        assert resp.status_code == 201
+        assert resp.headers['ETag'] == '"1"'
+        assert resp.get_data(as_text=True).endswith('\n')
+        assert json.loads(resp.get_data()) == PAYLOAD
+
+    def test_stdlib_fallback(self, app, monkeypatch):
+        # Integers beyond 64 bits can't be encoded by orjson
+        with app.app_context():
+            resp = output_json({'qty': 2 ** 64}, 200)
+        assert json.loads(resp.get_data()) == {'qty': 2 ** 64}
+
+        # Custom settings are passed to the stdlib encoder
+        app.config['RESTFUL_JSON'] = {'sort_keys': True}
+        with app.app_context():
+            resp = output_json({'b': 1, 'a': 2}, 200)
+        assert resp.get_data(as_text=True) == '{"a": 2, "b": 1}\n'
+
+        # As is everything when orjson isn't installed
+        app.config['RESTFUL_JSON'] = {}
+        monkeypatch.setattr(representations, "orjson", None)
+        with app.app_context():
+            resp = output_json(PAYLOAD, 200)
+        assert json.loads(resp.get_data()) == PAYLOAD
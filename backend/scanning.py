@@ -0,0 +1,125 @@
+"""
+Parallel segmented scans for reading entire DynamoDB tables.
+The table is split into `total_segments` segments which are scanned concurrently on a bounded
+thread pool.  Results are streamed back to the caller as each segment returns them.
+"""
+from backend.global_logger import logger
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Empty, Full
+from threading import Event
+
+DEFAULT_TOTAL_SEGMENTS = 4
+
+# Items buffered between the segment workers and the consumer
+QUEUE_SIZE = 1000
+
+# Marks the end of a single segment's results
+_SEGMENT_DONE = object()
+
+
+class _SegmentError:
+    """Wraps an exception raised by a segment worker so it can be re-raised by the consumer."""
+    def __init__(self, exception):
+        self.exception = exception
+
+
+def iter_segments(scan_segment, total_segments=DEFAULT_TOTAL_SEGMENTS, max_workers=None):
+    """
+    Generator yielding every item returned by `scan_segment(segment, total_segments)` for each
+    segment in the range [0, total_segments).  Order of the results is not guaranteed.
+    `max_workers` bounds the number of concurrent scans; defaults to `total_segments`.
+    """
+    if total_segments < 1:
+        raise ValueError(f"total_segments must be a positive integer, not: {total_segments}.")
+
+    # No need for threads when there's only one segment
+    if total_segments == 1:
+        yield from scan_segment(0, 1)
+        return
+
+    max_workers = min(max_workers or total_segments, total_segments)
+    results = Queue(maxsize=QUEUE_SIZE)
+    stop = Event()
+
+    def put(item) -> bool:
+        """Add an item to the queue, giving up if the consumer has stopped listening."""
+        while not stop.is_set():
+            try:
+                results.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def worker(segment):
+        try:
+            for item in scan_segment(segment, total_segments):
+                if not put(item):
+                    return
+        except BaseException as e:
+            put(_SegmentError(e))
+        finally:
+            put(_SEGMENT_DONE)
+
+    logger.debug(f"Starting a parallel scan: {total_segments} segments, {max_workers} workers.")
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scan-segment')
+    try:
+        for segment in range(total_segments):
+            executor.submit(worker, segment)
+
+        remaining = total_segments
+        while remaining:
+            try:
+                item = results.get(timeout=0.1)
+            except Empty:
+                continue
+
+            if item is _SEGMENT_DONE:
+                remaining -= 1
+            elif isinstance(item, _SegmentError):
+                raise item.exception
+            else:
+                yield item
+
+        logger.debug(f"Parallel scan complete.")
+
+    finally:
+        # Release any workers still running, e.g. when the consumer stops early or a segment fails
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def scan_model(model, total_segments=DEFAULT_TOTAL_SEGMENTS, max_workers=None, **scan_kwargs):
+    """
+    Generator yielding every instance of the provided pynamodb `model`, using a parallel scan.
+    Additional keyword args (e.g. `filter_condition`, `attributes_to_get`) are passed to
+    `model.scan()` for each segment.
+    """
+    def scan_segment(segment, segments):
+        if segments == 1:
+            return model.scan(**scan_kwargs)
+        return model.scan(segment=segment, total_segments=segments, **scan_kwargs)
+
+    return iter_segments(scan_segment, total_segments=total_segments, max_workers=max_workers)
+
+
+def scan_table(table, total_segments=DEFAULT_TOTAL_SEGMENTS, max_workers=None, **scan_kwargs):
+    """
+    Generator yielding every item in the provided boto3 `Table` resource, using a parallel scan.
+    Additional keyword args are passed to `table.scan()` for each page of each segment.
+    """
+    def scan_segment(segment, segments):
+        kwargs = dict(scan_kwargs)
+        if segments > 1:
+            kwargs.update(Segment=segment, TotalSegments=segments)
+
+        # Read every page of this segment
+        while True:
+            page = table.scan(**kwargs)
+            yield from page.get('Items', [])
+
+            if 'LastEvaluatedKey' not in page:
+                break
+            kwargs['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+    return iter_segments(scan_segment, total_segments=total_segments, max_workers=max_workers)
@@ -0,0 +1,60 @@
+from backend.scanning import iter_segments, scan_table
+import pytest
+
+
+def fake_scan_segment(segment, total_segments):
+    """Pretend each segment holds 10 items."""
+    return [f"{segment}-{i}" for i in range(10)]
+
+
+class FakeTable:
+    """Minimal stand-in for a boto3 Table that returns two pages per segment."""
+    def __init__(self):
+        self.calls = []
+
+    def scan(self, **kwargs):
+        self.calls.append(kwargs)
+        segment = kwargs.get('Segment', 0)
+        if 'ExclusiveStartKey' not in kwargs:
+            return {'Items': [f"{segment}-a"], 'LastEvaluatedKey': {'id': f"{segment}-a"}}
+        return {'Items': [f"{segment}-b"]}
+
+
+class TestIterSegments:
+    def test_all_segments_returned(self):
+        results = list(iter_segments(fake_scan_segment, total_segments=4, max_workers=2))
+        assert len(results) == 40
+        assert sorted(results) == sorted(f"{s}-{i}" for s in range(4) for i in range(10))
+
+    def test_single_segment(self):
+        assert list(iter_segments(fake_scan_segment, total_segments=1)) == fake_scan_segment(0, 1)
+
+    def test_invalid_segments(self):
+        with pytest.raises(ValueError):
+            list(iter_segments(fake_scan_segment, total_segments=0))
+
+    def test_errors_propagate(self):
+        def failing_scan_segment(segment, total_segments):
+            if segment == 2:
+                raise RuntimeError("Segment failed")
+            return fake_scan_segment(segment, total_segments)
+
+        with pytest.raises(RuntimeError):
+            list(iter_segments(failing_scan_segment, total_segments=4))
+
+    def test_early_exit(self):
+        # The consumer may stop reading before all segments have finished
+        results = iter_segments(fake_scan_segment, total_segments=4)
+        assert next(results) is not None
+        results.close()
+
+
+class TestScanTable:
+    def test_scan_table(self):
+        table = FakeTable()
+        results = list(scan_table(table, total_segments=3))
+
+        # Every page of every segment is read
+        assert sorted(results) == ['0-a', '0-b', '1-a', '1-b', '2-a', '2-b']
+        assert len(table.calls) == 6
+        assert all(call['TotalSegments'] == 3 for call in table.calls)
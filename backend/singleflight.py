@@ -0,0 +1,63 @@
+"""
+Coalesces concurrent identical reads, so a burst of requests shares one in-flight DynamoDB operation.
+Only calls that overlap are shared; once a call completes, the next one starts a fresh read.
+"""
+from threading import Event, Lock
+
+
+class _Call(object):
+    """A call in flight, whose result (or error) is shared with any duplicate callers."""
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """
+    Runs at most one call per key at a time.  Callers arriving while a call for the same key is in
+    flight wait for it, and receive its result or exception instead of running their own.
+    Results are shared between callers, so they must be treated as read-only.
+    """
+    def __init__(self):
+        self._calls = {}
+        self._lock = Lock()
+
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """Return function(*args, **kwargs), sharing the call with concurrent callers for this key."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.calls += 1
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'calls': self.calls, 'shared': self.shared, 'in_flight': len(self._calls)}
+
+
+cellar_reads = SingleFlight()
+picklist_reads = SingleFlight()
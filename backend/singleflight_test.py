@@ -0,0 +1,58 @@
+from backend.singleflight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import sleep
+import pytest
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_are_shared(self):
+        flight = SingleFlight()
+        release = Event()
+        calls = []
+
+        def slow_read():
+            calls.append(1)
+            release.wait(5)
+            return ["beverage"]
+
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(flight.do, "cellar", slow_read) for _ in range(5)]
+            while flight.stats()['shared'] < 4:
+                sleep(0.001)
+            release.set()
+            results = [future.result() for future in futures]
+
+        # Only one read ran, and every caller received its result
+        assert len(calls) == 1
+        assert results == [["beverage"]] * 5
+        assert flight.stats() == {'calls': 1, 'shared': 4, 'in_flight': 0}
+
+        # Once complete, the next call reads again
+        flight.do("cellar", slow_read)
+        assert len(calls) == 2
+
+    def test_errors_are_shared(self):
+        flight = SingleFlight()
+        release = Event()
+
+        def failing_read():
+            release.wait(5)
+            raise RuntimeError("Scan failed")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(flight.do, "cellar", failing_read) for _ in range(2)]
+            while flight.stats()['shared'] < 1:
+                sleep(0.001)
+            release.set()
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result()
+
+        assert flight.stats()['in_flight'] == 0
+
+    def test_keys_are_independent(self):
+        flight = SingleFlight()
+        assert flight.do("a", lambda: 1) == 1
+        assert flight.do("b", lambda x: x, 2) == 2
+        assert flight.stats()['shared'] == 0
@@ -1,4 +1,5 @@
 """Config file for extending pytest functionality to packages w/o native support."""
+from backend.models import Beverage
 from testfixtures import LogCapture
 import pytest
 
@@ -7,3 +8,13 @@ import pytest
 def capture():
     with LogCapture() as capture:
         yield capture
+
+
+@pytest.fixture
+def stored_beverage():
+    """Factory for serialized beverages, as DynamoDB would return them.  Keyword args override any attribute."""
+    def make(**attributes) -> dict:
+        defaults = dict(beverage_id="Westbrook Gose 2013", producer="Westbrook", name="Gose", year=2013,
+                        size="12 oz", location="Home")
+        return Beverage(**{**defaults, **attributes}).serialize()
+    return make
@@ -0,0 +1,124 @@
+"""Adds any missing global secondary indexes to existing Cellar tables, both local and in the cloud."""
+from boto3 import client
+from os import environ
+from env_tools import apply_env
+from time import sleep
+
+# Indexes defined on the Beverage model
+CELLAR_INDEXES = [
+    {
+        'IndexName': 'producer-year-index',
+        'KeySchema': [
+            {
+                'AttributeName': 'producer',
+                'KeyType':       'HASH'
+            },
+            {
+                'AttributeName': 'year',
+                'KeyType':       'RANGE'
+            }
+        ],
+        'AttributeDefinitions': [
+            {
+                'AttributeName': 'producer',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'year',
+                'AttributeType': 'N'
+            }
+        ]
+    },
+    {
+        'IndexName': 'location-producer-index',
+        'KeySchema': [
+            {
+                'AttributeName': 'location',
+                'KeyType':       'HASH'
+            },
+            {
+                'AttributeName': 'producer',
+                'KeyType':       'RANGE'
+            }
+        ],
+        'AttributeDefinitions': [
+            {
+                'AttributeName': 'location',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'producer',
+                'AttributeType': 'S'
+            }
+        ]
+    }
+]
+
+
+def add_missing_indexes(provided_client, table_name="Cellar"):
+    """Creates each index in CELLAR_INDEXES that doesn't already exist on the table."""
+    description = provided_client.describe_table(TableName=table_name)['Table']
+    existing = [index['IndexName'] for index in description.get('GlobalSecondaryIndexes', [])]
+
+    for index in CELLAR_INDEXES:
+        if index['IndexName'] in existing:
+            print(f" --> {index['IndexName']} already exists on {table_name}")
+            continue
+
+        print(f" --> Creating {index['IndexName']} on {table_name}")
+        provided_client.update_table(
+            TableName=table_name,
+            AttributeDefinitions=index['AttributeDefinitions'],
+            GlobalSecondaryIndexUpdates=[
+                {
+                    'Create': {
+                        'IndexName':             index['IndexName'],
+                        'KeySchema':             index['KeySchema'],
+                        'Projection':            {'ProjectionType': 'ALL'},
+                        'ProvisionedThroughput': {
+                            'ReadCapacityUnits':  5,
+                            'WriteCapacityUnits': 5
+                        }
+                    }
+                }
+            ]
+        )
+
+        # DynamoDB only allows one index to be created at a time
+        provided_client.get_waiter('table_exists').wait(TableName=table_name)
+        while True:
+            description = provided_client.describe_table(TableName=table_name)['Table']
+            statuses = [each['IndexStatus'] for each in description.get('GlobalSecondaryIndexes', [])]
+            if all(status == 'ACTIVE' for status in statuses):
+                break
+            sleep(10)
+
+        print(f" --> {index['IndexName']} created")
+
+
+# Environment variables
+apply_env()
+aws_region = environ.get('AWS_REGION')
+aws_access_key = environ.get('AWS_ACCESS_KEY_ID')
+aws_secret_access_key = environ.get('AWS_SECRET_ACCESS_KEY')
+
+# Local connection
+db_local_client = client('dynamodb',
+                         region_name=aws_region,
+                         aws_access_key_id=aws_access_key,
+                         aws_secret_access_key=aws_secret_access_key,
+                         endpoint_url='http://localhost:8008')
+
+# Cloud connection (primary)
+db_cloud_primary_client = client('dynamodb',
+                                 region_name=aws_region,
+                                 aws_access_key_id=aws_access_key,
+                                 aws_secret_access_key=aws_secret_access_key)
+
+print("Adding indexes to the local Cellar table")
+add_missing_indexes(db_local_client)
+
+print("Adding indexes to the cloud primary Cellar table")
+add_missing_indexes(db_cloud_primary_client)
+
+print("Done adding indexes.")
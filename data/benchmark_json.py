@@ -0,0 +1,51 @@
+"""
+Compares the time to encode an /api/v1/cellar response with the stdlib & orjson representations.
+The payload is built from the example data, repeated to the requested number of beverages.
+Usage: python -m data.benchmark_json [--beverages 5000] [--runs 20]
+"""
+from backend.models import Beverage
+from backend.representations import output_json, orjson
+from data.example_data import example_data
+from flask import Flask
+from flask_restful.representations.json import output_json as stdlib_output_json
+from argparse import ArgumentParser
+from timeit import repeat
+
+
+def cellar_payload(count) -> dict:
+    """Response body returned by CellarCollectionApi.get for `count` beverages."""
+    beverages = []
+    while len(beverages) < count:
+        for item in example_data[:count - len(beverages)]:
+            beverage = Beverage(**item)
+            beverage.beverage_id = f"{beverage.beverage_id}-{len(beverages)}"
+            beverages.append(beverage.to_dict(dates_as_epoch=True))
+    return {'message': 'Success', 'data': beverages}
+
+
+def best_time(representation, payload, runs) -> float:
+    """Fastest of `runs` encodings, in ms."""
+    return min(repeat(lambda: representation(payload, 200), number=1, repeat=runs)) * 1000
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Benchmark the JSON representations.")
+    parser.add_argument('--beverages', type=int, default=5000, help="Beverages in the payload.")
+    parser.add_argument('--runs', type=int, default=20, help="Encodings timed for each representation.")
+    args = parser.parse_args()
+
+    payload = cellar_payload(args.beverages)
+    app = Flask("benchmark_json")
+
+    with app.app_context():
+        size = len(stdlib_output_json(payload, 200).get_data())
+        print(f"Payload: {args.beverages} beverages, {size / 1024:.0f} KiB.")
+
+        stdlib_ms = best_time(stdlib_output_json, payload, args.runs)
+        print(f"stdlib: {stdlib_ms:.1f} ms")
+
+        if orjson is None:
+            print("orjson isn't installed; responses use the stdlib encoder.")
+        else:
+            orjson_ms = best_time(output_json, payload, args.runs)
+            print(f"orjson: {orjson_ms:.1f} ms ({stdlib_ms / orjson_ms:.1f}x faster)")
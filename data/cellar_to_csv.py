@@ -0,0 +1,29 @@
+"""
+Writes the cellar inventory to a CSV in the spreadsheet format read by csv_to_dictionary.py.
+Rows are written as each page of the table is read, so the whole cellar is never held in memory.
+Usage: python -m data.cellar_to_csv [output.csv]  (writes to stdout when no file is provided)
+"""
+from backend.exports import iter_beverages, iter_csv, CSV_READ_FIELDS
+from argparse import ArgumentParser
+import sys
+
+
+def export(output) -> int:
+    """Write every beverage to the provided file object.  Returns the number of rows written."""
+    rows = -1
+    for rows, line in enumerate(iter_csv(iter_beverages(fields=CSV_READ_FIELDS))):
+        output.write(line)
+    return rows
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description="Export the cellar inventory to CSV.")
+    parser.add_argument('path', nargs='?', help="File to write; defaults to stdout.")
+    args = parser.parse_args()
+
+    if args.path:
+        with open(args.path, mode='w', newline='') as csv_file:
+            count = export(csv_file)
+        print(f"Exported {count} beverages to {args.path}.")
+    else:
+        export(sys.stdout)
@@ -2,6 +2,7 @@
 from boto3 import resource, client
 from os import environ
 from env_tools import apply_env
+from backend.scanning import scan_table
 
 
 def create_cellar_table(provided_resource, table_name="Cellar"):
@@ -26,6 +27,56 @@ def create_cellar_table(provided_resource, table_name="Cellar"):
             {
                 'AttributeName': 'location',
                 'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'producer',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'year',
+                'AttributeType': 'N'
+            }
+        ],
+        GlobalSecondaryIndexes=[
+            {
+                'IndexName': 'producer-year-index',
+                'KeySchema': [
+                    {
+                        'AttributeName': 'producer',
+                        'KeyType':       'HASH'
+                    },
+                    {
+                        'AttributeName': 'year',
+                        'KeyType':       'RANGE'
+                    }
+                ],
+                'Projection': {
+                    'ProjectionType': 'ALL'
+                },
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits':  5,
+                    'WriteCapacityUnits': 2
+                }
+            },
+            {
+                'IndexName': 'location-producer-index',
+                'KeySchema': [
+                    {
+                        'AttributeName': 'location',
+                        'KeyType':       'HASH'
+                    },
+                    {
+                        'AttributeName': 'producer',
+                        'KeyType':       'RANGE'
+                    }
+                ],
+                'Projection': {
+                    'ProjectionType': 'ALL'
+                },
+                'ProvisionedThroughput': {
+                    'ReadCapacityUnits':  5,
+                    'WriteCapacityUnits': 2
+                }
             }
         ],
         ProvisionedThroughput={
@@ -66,6 +117,86 @@ def create_picklist_table(provided_resource, table_name="CellarPicklists"):
     print(f"Table {table_name} created")
 
 
+def create_change_log_table(provided_resource, table_name="CellarChanges"):
+    print(f"Creating table {table_name} for {provided_resource.__str__()}")
+    table = provided_resource.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {
+                'AttributeName': 'day',
+                'KeyType':       'HASH'
+            },
+            {
+                'AttributeName': 'change_id',
+                'KeyType':       'RANGE'
+            }
+        ],
+        AttributeDefinitions=[
+            {
+                'AttributeName': 'day',
+                'AttributeType': 'S'
+            },
+            {
+                'AttributeName': 'change_id',
+                'AttributeType': 'S'
+            }
+        ],
+        ProvisionedThroughput={
+            'ReadCapacityUnits':  1,
+            'WriteCapacityUnits': 1
+        }
+    )
+
+    # Pause until the table is created
+    table.meta.client.get_waiter('table_exists').wait(TableName=table_name)
+
+    # Let DynamoDB remove expired entries
+    table.meta.client.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={
+            'Enabled':       True,
+            'AttributeName': 'expires'
+        }
+    )
+    print(f"Table {table_name} created")
+
+
+def create_idempotency_table(provided_resource, table_name="CellarIdempotency"):
+    print(f"Creating table {table_name} for {provided_resource.__str__()}")
+    table = provided_resource.create_table(
+        TableName=table_name,
+        KeySchema=[
+            {
+                'AttributeName': 'key',
+                'KeyType':       'HASH'
+            }
+        ],
+        AttributeDefinitions=[
+            {
+                'AttributeName': 'key',
+                'AttributeType': 'S'
+            }
+        ],
+        ProvisionedThroughput={
+            'ReadCapacityUnits':  1,
+            'WriteCapacityUnits': 1
+        }
+    )
+
+    # Pause until the table is created
+    table.meta.client.get_waiter('table_exists').wait(TableName=table_name)
+
+    # Let DynamoDB remove expired entries
+    table.meta.client.update_time_to_live(
+        TableName=table_name,
+        TimeToLiveSpecification={
+            'Enabled':       True,
+            'AttributeName': 'expires'
+        }
+    )
+    print(f"Table {table_name} created")
+
+
 def purge_all_table_data(table, hash_name=None, range_name=None):
     """Deletes all items from the provided DynamoDB table."""
     data = table.scan()
@@ -87,14 +218,14 @@ def purge_all_table_data(table, hash_name=None, range_name=None):
                 )
 
 
-def copy_all_table_data(source_table, destination_table):
+def copy_all_table_data(source_table, destination_table, total_segments=4):
     """
     Reads all data from the source table, then writes to the destination table.
+    The source table is read using a parallel scan split into `total_segments` segments.
     Both tables must have the same schema.
     """
-    data = source_table.scan()
     with destination_table.batch_writer() as batch:
-        for each in data['Items']:
+        for each in scan_table(source_table, total_segments=total_segments):
             batch.put_item(Item=each)
 
 
@@ -138,6 +269,12 @@ if 'Cellar' not in db_cloud_primary.list_tables()['TableNames']:
 if 'CellarPicklists' not in db_cloud_primary.list_tables()['TableNames']:
     create_picklist_table(db_cloud_primary)
 
+if 'CellarChanges' not in db_cloud_primary.list_tables()['TableNames']:
+    create_change_log_table(db_cloud_primary)
+
+if 'CellarIdempotency' not in db_cloud_primary.list_tables()['TableNames']:
+    create_idempotency_table(db_cloud_primary)
+
 # Define local tables
 cellar_table_local = db_local.Table('Cellar')
 picklist_table_local = db_local.Table('CellarPicklists')
@@ -15,8 +15,14 @@ from flask_cors import CORS
 from flask_restful import Api
 
 # App components
-from backend.cellar_routes import CellarCollectionApi, BeverageApi
-from backend.picklist_routes import PicklistApi
+from backend.cellar_routes import CellarCollectionApi, CellarExportApi, BeverageBulkApi, \
+    BeverageBatchGetApi, BeverageLocationsApi, BeverageMoveApi, BeverageApi, BeverageQtyApi
+from backend.producer_routes import ProducerBeveragesApi
+from backend.location_routes import LocationBeveragesApi
+from backend.picklist_routes import PicklistApi, PicklistItemApi
+from backend.cache_routes import CacheStatsApi
+from backend.representations import output_json
+from backend.compression import compress_response
 
 app = Flask("cellarsync")
 logger.info(f"Flask app {app.name} created!")
@@ -30,10 +36,25 @@ logging.getLogger('flask_cors').level = logging.DEBUG
 CORS(app, resources={r"/api/*": {"origins": Config.WHITELISTED_ORIGINS}})
 logger.info("CORS initialized.")
 
+# Compress large responses for clients which accept gzip or brotli
+app.after_request(compress_response)
+logger.info("Response compression enabled.")
+
 api = Api(app)
+api.representation('application/json')(output_json)
 logger.info("Flask-RESTful API initialized.")
 
 # Define the functional endpoints
 api.add_resource(CellarCollectionApi, '/api/v1/cellar')
+api.add_resource(CellarExportApi, '/api/v1/cellar/export')
+api.add_resource(BeverageBulkApi, '/api/v1/cellar/bulk')
+api.add_resource(BeverageBatchGetApi, '/api/v1/cellar/batch-get')
+api.add_resource(BeverageLocationsApi, '/api/v1/cellar/<beverage_id>')
+api.add_resource(BeverageMoveApi, '/api/v1/cellar/<beverage_id>/move')
 api.add_resource(BeverageApi, '/api/v1/cellar/<beverage_id>/<location>')
+api.add_resource(BeverageQtyApi, '/api/v1/cellar/<beverage_id>/<location>/qty')
+api.add_resource(ProducerBeveragesApi, '/api/v1/producers/<producer>/beverages')
+api.add_resource(LocationBeveragesApi, '/api/v1/locations/<location>/beverages')
 api.add_resource(PicklistApi, '/api/v1/picklist-data')
+api.add_resource(PicklistItemApi, '/api/v1/picklist-data/<list_name>')
+api.add_resource(CacheStatsApi, '/api/v1/cache-stats')